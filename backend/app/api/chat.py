@@ -1,17 +1,53 @@
 """Chat API endpoints."""
 from fastapi import APIRouter, HTTPException
-from app.models import ChatRequest, ChatResponse, ChatMessage
+from fastapi.responses import ORJSONResponse
+from app.models import ChatRequest, ChatResponse
 from services.rag_engine import rag_engine
 from services.session_manager import session_manager
+from services.memory_service import memory_service
+from app.config import settings
+from cachetools import TTLCache
 from datetime import datetime
+from typing import Mapping, Sequence
+import asyncio
+import hashlib
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Cache of RAG results keyed by conversation prefix and request options
+_response_cache = TTLCache(maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl)
 
-@router.post("", response_model=ChatResponse)
+
+def clear_response_cache() -> None:
+    """Drop cached responses, e.g. after the knowledge base or retrieval settings changed."""
+    _response_cache.clear()
+    logger.info("Cleared response cache")
+
+
+def _response_cache_key(request: ChatRequest, conversation_history: Sequence[Mapping[str, str]]) -> str:
+    """Build a cache key from the conversation prefix, the message, the request options and retrieval settings."""
+    # Ingestion clears the cache, so the knowledge base itself need not be part of the key
+    payload = json.dumps(
+        [
+            [[msg["role"], msg["content"]] for msg in conversation_history],
+            request.message,
+            request.use_knowledge_base,
+            request.use_reranking,
+            settings.top_k_stage1,
+            settings.rerank_top_k,
+            settings.top_k_results,
+            settings.max_memory_messages
+        ],
+        sort_keys=True
+    )
+    return hashlib.blake2b(payload.encode("utf-8")).hexdigest()
+
+
+@router.post("", response_class=ORJSONResponse, responses={200: {"model": ChatResponse}})
 async def send_message(request: ChatRequest):
     """
     Send a message and get RAG-based response.
@@ -22,65 +58,90 @@ async def send_message(request: ChatRequest):
     Returns:
         Chat response with user message, assistant message, and sources
     """
+    # Naive UTC, like every other timestamp the session database stores and compares
+    now = datetime.utcnow()
+    
     try:
-        # Verify session exists
-        session = session_manager.get_session_detail(request.session_id)
+        # Verify session exists, get conversation history (last 5 messages)
+        # and add the user message to the session in one transaction
+        # May wait for the message writer, keep it off the event loop
+        session, conversation_history = await asyncio.to_thread(
+            session_manager.begin_turn,
+            request.session_id,
+            request.message,
+            timestamp=now
+        )
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        # Get conversation history (last 5 messages)
-        conversation_history = session_manager.get_conversation_history(request.session_id)
         is_first_message = len(conversation_history) == 0
-        
-        # Add user message to session
-        session_manager.add_user_message(request.session_id, request.message)
+        naming = None
         
         if is_first_message:
-            # Generate a descriptive name like ChatGPT
-            session_manager.auto_name_session(request.session_id, request.message)
-        
-        # Initialize session memories if it's the first turn (optional, but requested by user pattern)
-        from services.memory_service import memory_service
-        existing_memories = memory_service.get_memories(request.session_id)
-        if not existing_memories:
-            memory_service.put_memory(
-                request.session_id, 
-                "preferences", 
+            # Generate a descriptive name like ChatGPT; the Bedrock call runs in a thread,
+            # alongside answer generation, and finishes before the response is sent
+            naming = asyncio.create_task(
+                asyncio.to_thread(session_manager.auto_name_session, request.session_id, request.message)
+            )
+            
+            # Initialize session memories on the first turn (put_memory overwrites, so it is idempotent).
+            # Storing embeds the value through Bedrock, so keep it off the event loop; it must
+            # finish before generation so the first answer already sees the preferences
+            await asyncio.to_thread(
+                memory_service.put_memory,
+                request.session_id,
+                "preferences",
                 {"rules": ["User likes short, direct language", "User only speaks English & Python"]}
             )
 
-        # Generate RAG response
-        answer, sources, rerank_summary = rag_engine.chat(
-            query=request.message,
-            session_id=request.session_id,
-            conversation_history=conversation_history,
-            use_knowledge_base=request.use_knowledge_base,
-            use_reranking=request.use_reranking
-        )
+        # Generate RAG response, reusing a cached one for repeated queries
+        cache_key = _response_cache_key(request, conversation_history) if settings.enable_response_cache else None
+        cached = _response_cache.get(cache_key) if cache_key else None
         
-        # Add assistant message to session
-        session_manager.add_assistant_message(request.session_id, answer, rerank_summary=rerank_summary)
+        if cached:
+            answer, sources, rerank_summary = cached
+            logger.info(f"Response cache hit for session {request.session_id}")
+        else:
+            answer, sources, rerank_summary = await rag_engine.chat(
+                query=request.message,
+                session_id=request.session_id,
+                conversation_history=conversation_history,
+                use_knowledge_base=request.use_knowledge_base,
+                use_reranking=request.use_reranking
+            )
+            if cache_key and answer:
+                _response_cache[cache_key] = (answer, sources, rerank_summary)
         
-        # Create response
-        user_msg = ChatMessage(
-            role="user",
-            content=request.message,
-            timestamp=datetime.utcnow()
-        )
+        if naming:
+            await naming
         
-        assistant_msg = ChatMessage(
-            role="assistant",
-            content=answer,
-            timestamp=datetime.utcnow()
+        # Add the answer to memory before responding, so a quick follow-up sees it;
+        # only the database write is deferred to the session writer
+        answered_at = datetime.utcnow()
+        await asyncio.to_thread(
+            session_manager.add_assistant_message,
+            request.session_id,
+            answer,
+            rerank_summary=rerank_summary,
+            timestamp=answered_at
         )
         
-        response = ChatResponse(
-            session_id=request.session_id,
-            user_message=user_msg,
-            assistant_message=assistant_msg,
-            sources=sources,
-            rerank_summary=rerank_summary
-        )
+        # Build the response from primitives; it matches ChatResponse, so skip revalidation
+        response = ORJSONResponse({
+            "session_id": request.session_id,
+            "user_message": {
+                "role": "user",
+                "content": request.message,
+                "timestamp": now
+            },
+            "assistant_message": {
+                "role": "assistant",
+                "content": answer,
+                "timestamp": answered_at
+            },
+            "sources": sources,
+            "rerank_summary": rerank_summary
+        })
         
         logger.info(f"Chat response generated for session {request.session_id}")
         return response
@@ -1,11 +1,25 @@
 """Document ingestion API endpoints."""
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models import IngestionResponse, IngestionStatus, IngestionRequest
-from services.document_processor import document_processor
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import ORJSONResponse
+from pathlib import Path
+from typing import List, Dict, Any, Tuple
+from app.models import (
+    IngestionResponse,
+    IngestionStatus,
+    IngestionRequest,
+    IngestionJobResponse,
+    IngestionJobStatus
+)
+from services.document_processor import document_processor, make_chunk_id
 from services.vector_store import vector_store
+from services.bedrock_client import bedrock_client
+from services.rag_engine import rag_engine
+from app.api.chat import clear_response_cache
+from services.session_manager import session_manager
 from database.session_db import session_db
-import uuid
+import asyncio
+import gc
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,17 +27,225 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/ingest", tags=["ingestion"])
 
 
-@router.post("", response_model=IngestionResponse)
-async def ingest_documents(request: IngestionRequest = None):
+def _filter_new_chunks(
+    texts: List[str],
+    metadatas: List[Dict[str, Any]]
+) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
     """
-    Ingest documents from data folder (incremental).
-    Only processes new or modified documents.
+    Assign content-hash IDs to chunks and drop those already embedded.
+    
+    Duplicates within the batch and chunks whose ID is already present in the
+    vector store are skipped, so re-ingesting unchanged content costs no
+    embedding calls. Hashes computed by the document processor are reused.
+    
+    Args:
+        texts: List of text chunks
+        metadatas: List of metadata dicts for each chunk
+        
+    Returns:
+        Tuple of (texts, metadatas, ids) for chunks that still need embedding
+    """
+    unique = {}
+    for text, metadata in zip(texts, metadatas):
+        content_hash = metadata.get('content_hash') or make_chunk_id(text)
+        if content_hash not in unique:
+            unique[content_hash] = (text, {**metadata, 'content_hash': content_hash})
+    
+    existing_ids = vector_store.get_existing_ids(list(unique))
+    new_ids = [chunk_id for chunk_id in unique if chunk_id not in existing_ids]
+    
+    skipped = len(texts) - len(new_ids)
+    if skipped:
+        logger.info(f"Skipping {skipped} duplicate or already embedded chunks")
+    
+    return (
+        [unique[chunk_id][0] for chunk_id in new_ids],
+        [unique[chunk_id][1] for chunk_id in new_ids],
+        new_ids
+    )
+
+
+async def _embed_and_add_batches(
+    texts: List[str],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str],
+    batch_size: int = 32,
+    max_concurrency: int = 4
+) -> None:
+    """
+    Embed and store chunks in fixed-size batches, several batches at a time.
     
     Args:
+        texts: List of text chunks
+        metadatas: List of metadata dicts for each chunk
+        ids: List of unique IDs for each chunk
+        batch_size: Number of chunks embedded per vector store call
+        max_concurrency: Maximum number of batches in flight (respects Bedrock TPS limits)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def embed_batch(start: int) -> None:
+        end_idx = min(start + batch_size, len(texts))
+        async with semaphore:
+            embeddings = await bedrock_client.generate_embeddings_async(texts[start:end_idx])
+            # Chroma writes are blocking, keep them off the event loop
+            await asyncio.to_thread(
+                vector_store.add_documents,
+                texts=texts[start:end_idx],
+                metadatas=metadatas[start:end_idx],
+                ids=ids[start:end_idx],
+                embeddings=embeddings
+            )
+        logger.info(f"Embedded batch {start // batch_size + 1} ({end_idx - start} chunks)")
+    
+    await asyncio.gather(*[embed_batch(i) for i in range(0, len(texts), batch_size)])
+
+
+def _build_document_row(file_path: str, file_chunk_counts: Dict[str, int], job_id: str = None) -> Dict[str, Any]:
+    """
+    Build the ingestion metadata row for a processed file.
+    
+    Args:
+        file_path: Path to the processed file
+        file_chunk_counts: Chunk counts produced by the document processor, keyed by filename
+        job_id: Optional ingestion job that processed the file
+        
+    Returns:
+        Document metadata row for session_db.add_documents_bulk
+    """
+    chunk_count = file_chunk_counts.get(Path(file_path).name, 0)
+    return document_processor.build_document_metadata(file_path, chunk_count, job_id=job_id)
+
+
+async def _run_ingestion(job_id: str, chunk_size: int = None, chunk_overlap: int = None) -> None:
+    """
+    Run an incremental ingestion in the background, recording progress on the job.
+    
+    Args:
+        job_id: Ingestion job to report progress on
+        chunk_size: Optional chunk size override
+        chunk_overlap: Optional chunk overlap override
+    """
+    from app.config import settings
+    
+    loop = asyncio.get_running_loop()
+    
+    try:
+        await asyncio.to_thread(session_db.update_ingestion_job, job_id, status='running')
+        
+        # Get files that need processing (hashing is blocking I/O)
+        files_to_process, skipped_files = await loop.run_in_executor(
+            None, document_processor.get_files_to_process
+        )
+        
+        total_chunks = 0
+        processed_filenames = []
+        
+        if files_to_process:
+            shards = document_processor.stream_chunks(
+                files_to_process,
+                shard_size=settings.ingest_shard_size,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap
+            )
+            file_chunk_counts = {}
+            
+            try:
+                while True:
+                    # Parsing and splitting are CPU-bound, pull each shard in the executor
+                    shard = await loop.run_in_executor(None, next, shards, None)
+                    if shard is None:
+                        break
+                    
+                    file_chunk_counts.update(shard['file_chunk_counts'])
+                    
+                    # Content-hash IDs let identical chunks skip embedding entirely
+                    chunks, metadatas, chunk_ids = await asyncio.to_thread(
+                        _filter_new_chunks, shard['chunks'], shard['metadatas']
+                    )
+                    
+                    # Embed and add to vector store in batches
+                    await _embed_and_add_batches(
+                        texts=chunks,
+                        metadatas=metadatas,
+                        ids=chunk_ids,
+                        batch_size=settings.embedding_batch_size,
+                        max_concurrency=settings.embedding_max_concurrency
+                    )
+                    
+                    total_chunks += len(chunks)
+                    logger.info(f"Added shard of {len(chunks)} chunks to vector store ({total_chunks} total)")
+                    
+                    await asyncio.to_thread(
+                        session_db.update_ingestion_job,
+                        job_id,
+                        progress=len(file_chunk_counts) / len(files_to_process),
+                        chunks_created=total_chunks
+                    )
+                    
+                    # Release the shard before parsing the next one
+                    del shard, chunks, metadatas, chunk_ids
+                    gc.collect()
+            finally:
+                # Shut the worker pool down even if this job fails mid-stream; closing
+                # waits for the workers, so keep it off the event loop
+                await loop.run_in_executor(None, shards.close)
+            
+            # Hash files in parallel, then write all metadata rows in one statement
+            executor = ThreadPoolExecutor(max_workers=settings.ingest_parallel_threads)
+            try:
+                document_rows = await asyncio.gather(*[
+                    loop.run_in_executor(executor, _build_document_row, file_path, file_chunk_counts, job_id)
+                    for file_path in files_to_process
+                ])
+            finally:
+                executor.shutdown(wait=False)
+            
+            await asyncio.to_thread(session_db.add_documents_bulk, document_rows)
+            processed_filenames = [row['filename'] for row in document_rows]
+        
+        if total_chunks:
+            # New chunks can change the answer to any previously retrieved query
+            rag_engine.clear_retrieval_cache()
+            clear_response_cache()
+        
+        result = IngestionResponse(
+            total_files=len(files_to_process) + len(skipped_files),
+            new_files_processed=len(files_to_process),
+            skipped_files=len(skipped_files),
+            total_chunks_created=total_chunks,
+            processed_files=list(processed_filenames),
+            skipped_files_list=skipped_files
+        )
+        
+        await asyncio.to_thread(
+            session_db.update_ingestion_job,
+            job_id,
+            status='completed',
+            progress=1.0,
+            chunks_created=total_chunks,
+            result=result.model_dump_json()
+        )
+        logger.info(f"Ingestion job {job_id} complete: {len(files_to_process)} processed, {len(skipped_files)} skipped")
+        
+    except Exception as e:
+        logger.error(f"Error during ingestion job {job_id}: {str(e)}")
+        await asyncio.to_thread(session_db.update_ingestion_job, job_id, status='failed', error=str(e))
+
+
+@router.post("", response_model=IngestionJobResponse, status_code=202)
+async def ingest_documents(background_tasks: BackgroundTasks, request: IngestionRequest = None):
+    """
+    Queue an incremental ingestion of the data folder.
+    Only new or modified documents are processed; progress is
+    reported through GET /ingest/status/{job_id}.
+    
+    Args:
+        background_tasks: FastAPI background task queue
         request: Optional ingestion settings
         
     Returns:
-        Ingestion statistics
+        ID and status of the queued ingestion job
     """
     try:
         from app.config import settings
@@ -42,84 +264,68 @@ async def ingest_documents(request: IngestionRequest = None):
             
             if request.max_memory_messages is not None:
                 settings.max_memory_messages = request.max_memory_messages
+                session_manager.resize_memory(request.max_memory_messages)
                 logger.info(f"Updated max_memory_messages to {request.max_memory_messages}")
-
-        # Get files that need processing
-        files_to_process, skipped_files = document_processor.get_files_to_process()
-        
-        if not files_to_process and not skipped_files:
-            return IngestionResponse(
-                total_files=0,
-                new_files_processed=0,
-                skipped_files=0,
-                total_chunks_created=0,
-                processed_files=[],
-                skipped_files_list=[]
-            )
+            
+            if request.top_k_stage1 is not None or request.rerank_top_k is not None:
+                # Cached results were retrieved with the old limits
+                rag_engine.clear_retrieval_cache()
+                clear_response_cache()
         
-        total_chunks = 0
-        processed_filenames = []
+        # Only one ingestion at a time: hand back the job already in flight
+        job, created = session_db.start_ingestion_job()
+        if not created:
+            logger.info(f"Ingestion job {job.id} already {job.status}")
+            return IngestionJobResponse(job_id=job.id, status=job.status)
         
-        if files_to_process:
-            # Process documents with possible overrides
-            chunk_size = request.chunk_size if request else None
-            chunk_overlap = request.chunk_overlap if request else None
-            
-            result = document_processor.process_documents(
-                files_to_process, 
-                chunk_size=chunk_size, 
-                chunk_overlap=chunk_overlap
-            )
-            
-            chunks = result['chunks']
-            metadatas = result['metadatas']
-            file_chunk_counts = result['file_chunk_counts']
-            
-            if chunks:
-                # Generate unique IDs for chunks
-                chunk_ids = [str(uuid.uuid4()) for _ in chunks]
-                
-                # Add to vector store
-                vector_store.add_documents(
-                    texts=chunks,
-                    metadatas=metadatas,
-                    ids=chunk_ids
-                )
-                
-                total_chunks = len(chunks)
-                logger.info(f"Added {total_chunks} chunks to vector store")
-            
-            # Update document metadata in database
-            for file_path in files_to_process:
-                chunk_count = file_chunk_counts.get(
-                    document_processor.calculate_file_hash(file_path),
-                    0
-                )
-                from pathlib import Path
-                filename = Path(file_path).name
-                chunk_count = file_chunk_counts.get(filename, 0)
-                
-                document_processor.update_document_metadata(file_path, chunk_count)
-                processed_filenames.append(filename)
-        
-        response = IngestionResponse(
-            total_files=len(files_to_process) + len(skipped_files),
-            new_files_processed=len(files_to_process),
-            skipped_files=len(skipped_files),
-            total_chunks_created=total_chunks,
-            processed_files=processed_filenames,
-            skipped_files_list=skipped_files
+        background_tasks.add_task(
+            _run_ingestion,
+            job.id,
+            chunk_size=request.chunk_size if request else None,
+            chunk_overlap=request.chunk_overlap if request else None
         )
         
-        logger.info(f"Ingestion complete: {len(files_to_process)} processed, {len(skipped_files)} skipped")
-        return response
+        return IngestionJobResponse(job_id=job.id, status=job.status)
         
     except Exception as e:
-        logger.error(f"Error during ingestion: {str(e)}")
+        logger.error(f"Error queuing ingestion: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/status", response_model=List[IngestionStatus])
+@router.get("/status/{job_id}", response_model=IngestionJobStatus)
+async def get_ingestion_job_status(job_id: str):
+    """
+    Get progress of an ingestion job.
+    
+    Args:
+        job_id: Ingestion job ID
+        
+    Returns:
+        Job status, progress and final statistics once completed
+    """
+    try:
+        job = session_db.get_ingestion_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Ingestion job not found")
+        
+        return IngestionJobStatus(
+            job_id=job.id,
+            status=job.status,
+            progress=job.progress,
+            chunks_created=job.chunks_created,
+            error=job.error,
+            result=IngestionResponse.model_validate_json(job.result) if job.result else None,
+            created_at=job.created_at,
+            updated_at=job.updated_at
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting ingestion job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/status", response_class=ORJSONResponse, responses={200: {"model": List[IngestionStatus]}})
 async def get_ingestion_status():
     """
     Get status of all ingested documents.
@@ -130,15 +336,16 @@ async def get_ingestion_status():
     try:
         documents = session_db.get_all_documents()
         
-        return [
-            IngestionStatus(
-                filename=doc.filename,
-                file_path=doc.file_path,
-                ingestion_date=doc.ingestion_date,
-                chunk_count=doc.chunk_count
-            )
+        return ORJSONResponse([
+            {
+                "filename": doc.filename,
+                "file_path": doc.file_path,
+                "ingestion_date": doc.ingestion_date,
+                "chunk_count": doc.chunk_count,
+                "job_id": doc.job_id
+            }
             for doc in documents
-        ]
+        ])
     except Exception as e:
         logger.error(f"Error getting ingestion status: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,10 @@
 """Session management API endpoints."""
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from typing import List
 from app.models import SessionCreate, Session, SessionDetail
 from services.session_manager import session_manager
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,7 +25,7 @@ async def create_session(request: SessionCreate):
     """
     try:
         session_id = session_manager.create_session(request.name)
-        session = session_manager.get_session_detail(session_id)
+        session = await asyncio.to_thread(session_manager.get_session_detail, session_id)
         
         return Session(
             id=session['id'],
@@ -36,7 +38,7 @@ async def create_session(request: SessionCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("", response_model=List[Session])
+@router.get("", response_class=ORJSONResponse, responses={200: {"model": List[Session]}})
 async def get_sessions():
     """
     Get all chat sessions.
@@ -45,16 +47,8 @@ async def get_sessions():
         List of sessions
     """
     try:
-        sessions = session_manager.get_all_sessions()
-        return [
-            Session(
-                id=s['id'],
-                name=s['name'],
-                created_at=s['created_at'],
-                updated_at=s['updated_at']
-            )
-            for s in sessions
-        ]
+        # Rows already match the Session schema, serialize them directly
+        return ORJSONResponse(session_manager.get_all_sessions_as_dicts())
     except Exception as e:
         logger.error(f"Error getting sessions: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -72,7 +66,7 @@ async def get_session(session_id: str):
         Session with messages
     """
     try:
-        session = session_manager.get_session_detail(session_id)
+        session = await asyncio.to_thread(session_manager.get_session_detail, session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -93,7 +87,7 @@ async def delete_all_sessions():
         Success message with count
     """
     try:
-        count = session_manager.delete_all_sessions()
+        count = await asyncio.to_thread(session_manager.delete_all_sessions)
         return {"message": "All sessions deleted successfully", "count": count}
     except Exception as e:
         logger.error(f"Error deleting all sessions: {str(e)}")
@@ -106,7 +100,7 @@ async def delete_session(session_id: str):
     Delete a session.
     """
     try:
-        success = session_manager.delete_session(session_id)
+        success = await asyncio.to_thread(session_manager.delete_session, session_id)
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -127,7 +121,7 @@ async def update_session(session_id: str, request: SessionCreate):
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        updated_session = session_manager.get_session_detail(session_id)
+        updated_session = await asyncio.to_thread(session_manager.get_session_detail, session_id)
         return Session(
             id=updated_session['id'],
             name=updated_session['name'],
@@ -1,8 +1,13 @@
 """Application configuration using Pydantic Settings."""
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from functools import cached_property
+from pathlib import Path
+from typing import List, Literal
 import os
 
+# Backend directory, resolved once at import
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -11,29 +16,69 @@ class Settings(BaseSettings):
     aws_region: str = "us-east-1"
     aws_bedrock_model_id: str = "anthropic.claude-3-haiku-20240307-v1:0"
     aws_bedrock_embedding_model_id: str = "amazon.titan-embed-text-v1"
+    embedding_dimensions: int = 1536  # Must match the embedding model output size
+    bedrock_max_pool_connections: int = 64
+    embedding_request_concurrency: int = 30  # In-flight embedding calls from async callers
+    embedding_cache_size: int = 4096  # Recently embedded texts kept in memory
+    embedding_cache_dtype: Literal["fp32", "fp16", "int8"] = "fp32"  # fp16 halves, int8 quarters cache memory
+    prompt_caching_enabled: bool = False  # Only for Bedrock models that support prompt caching
     
     # API Configuration
     api_host: str = "0.0.0.0"
     api_port: int = 8000
-    cors_origins: List[str] = ["http://localhost:5173", "http://localhost:5174", "http://localhost:3000", "*"]
+    api_reload: bool = True  # Development mode: single worker with auto-reload
+    # Worker processes when api_reload is off. Sessions, memories, caches and the Chroma
+    # client are per-process, so more than one worker splits a conversation's state
+    api_workers: int = 1
+    cors_origins: List[str] = ["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"]
     
     # Storage Paths (relative to backend directory)
     data_folder: str = "../data"
     storage_folder: str = "../storage"
     chroma_db_path: str = "../storage/chroma_db"
     session_db_path: str = "../storage/sessions.db"
+    session_db_pool_size: int = 10
+    session_db_max_overflow: int = 20
     
     # RAG Configuration
     top_k_results: int = 5
     similarity_threshold: float = 0.7  # Low L2 distance = High similarity
     chunk_size: int = 1000
     chunk_overlap: int = 200
+    min_chunk_size: int = 100  # Shorter chunks are merged into a neighbour (0 disables)
+    text_splitter_backend: Literal["langchain", "native"] = "langchain"  # native requires semantic-text-splitter
     max_memory_messages: int = 5
+    max_cached_sessions: int = 1024  # Session histories kept in RAM; colder ones reload from the database
+    warm_sessions_on_startup: int = 100  # Most recent session histories preloaded at startup (0 disables)
+    sessions_list_cache_ttl: float = 2.0  # Seconds the sidebar session list is served from memory
+    message_write_queue_size: int = 10000  # Messages waiting for the background writer
+    message_write_batch_size: int = 100  # Messages inserted per writer transaction
+    message_write_max_wait_ms: float = 50.0  # How long the writer waits to fill a batch
     cross_encoder_enabled: bool = False
+    cross_encoder_backend: Literal["torch", "onnx"] = "torch"  # onnx requires export_onnx_reranker.py
+    cross_encoder_onnx_dir: str = "./models/cross-encoder-onnx"
+    
+    # Response Cache Settings
+    enable_response_cache: bool = True
+    response_cache_size: int = 1024
+    response_cache_ttl: int = 3600  # Seconds
+    retrieval_cache_size: int = 1024  # Retrieval results cached per query and options
+    query_embedding_cache_size: int = 2048  # Search query embeddings cached per normalized query
+    
+    # Ingestion Settings
+    embedding_batch_size: int = 32  # Chunks embedded and written per vector store call
+    embedding_max_concurrency: int = 4  # Embedding batches in flight at once
+    ingest_parallel_threads: int = 8  # Threads for per-file I/O such as hashing
+    ingest_process_workers: int = os.cpu_count() or 1  # Processes parsing and splitting files
+    ingest_chunk_timeout: int = 300  # Seconds allowed to process a single file
+    ingest_shard_size: int = 500  # Chunks buffered in memory before they are embedded
     
     # Advanced Reranking Settings
     rerank_top_k: int = 5
     top_k_stage1: int = 50
+    rerank_batch_max_size: int = 32  # Concurrent rerank requests scored in one forward pass
+    rerank_batch_max_wait_ms: float = 5.0  # How long to wait for more requests to join a batch
+    rerank_max_length: int = 256  # Tokens per query/document pair fed to the Cross-Encoder
     
     # Collection name for ChromaDB
     collection_name: str = "document_chunks"
@@ -46,14 +91,30 @@ class Settings(BaseSettings):
     
     def get_absolute_path(self, relative_path: str) -> str:
         """Convert relative path to absolute path from backend directory."""
-        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        return os.path.abspath(os.path.join(backend_dir, relative_path))
+        return os.path.abspath(BACKEND_DIR / relative_path)
+    
+    # Resolved once on first access; storage paths don't change at runtime
+    @cached_property
+    def data_folder_abs(self) -> str:
+        return self.get_absolute_path(self.data_folder)
+    
+    @cached_property
+    def storage_folder_abs(self) -> str:
+        return self.get_absolute_path(self.storage_folder)
+    
+    @cached_property
+    def chroma_db_path_abs(self) -> str:
+        return self.get_absolute_path(self.chroma_db_path)
+    
+    @cached_property
+    def session_db_path_abs(self) -> str:
+        return self.get_absolute_path(self.session_db_path)
 
 
 # Global settings instance
 settings = Settings()
 
 # Ensure storage directories exist
-os.makedirs(settings.get_absolute_path(settings.data_folder), exist_ok=True)
-os.makedirs(settings.get_absolute_path(settings.storage_folder), exist_ok=True)
-os.makedirs(settings.get_absolute_path(settings.chroma_db_path), exist_ok=True)
+os.makedirs(settings.data_folder_abs, exist_ok=True)
+os.makedirs(settings.storage_folder_abs, exist_ok=True)
+os.makedirs(settings.chroma_db_path_abs, exist_ok=True)
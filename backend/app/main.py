@@ -1,6 +1,8 @@
 """FastAPI main application."""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from app.config import settings
 from app.models import HealthResponse
@@ -20,14 +22,26 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
     logger.info("Starting RAG Chatbot API")
-    logger.info(f"Data folder: {settings.get_absolute_path(settings.data_folder)}")
-    logger.info(f"Storage folder: {settings.get_absolute_path(settings.storage_folder)}")
+    logger.info(f"Data folder: {settings.data_folder_abs}")
+    logger.info(f"Storage folder: {settings.storage_folder_abs}")
     
     # Initialize services (they auto-initialize on import)
     from services.vector_store import vector_store
     from database.session_db import session_db
+    from services.memory_service import memory_service
+    from services.rag_engine import rag_engine
+    from services.session_manager import session_manager
     
     logger.info(f"Vector store initialized with {vector_store.get_collection_count()} documents")
+    
+    # Background ingestion jobs do not survive a restart
+    session_db.fail_interrupted_ingestion_jobs()
+    
+    # Load recent conversation histories in one query instead of one per first request
+    session_manager.warm_recent(settings.warm_sessions_on_startup)
+    
+    # Pay model and client cold starts now rather than on the first chat request
+    await rag_engine.warmup()
     logger.info("Application startup complete")
     
     yield
@@ -41,7 +55,8 @@ app = FastAPI(
     title="RAG Chatbot API",
     description="RAG-based chatbot with AWS Bedrock, session management, and rolling memory",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -51,8 +66,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
+# Compress larger responses (RAG answers with sources)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Include routers
 app.include_router(chat.router)
 app.include_router(sessions.router)
@@ -95,9 +114,22 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(
-        "app.main:app",
-        host=settings.api_host,
-        port=settings.api_port,
-        reload=True
-    )
+    if settings.api_reload:
+        # Development: single worker with auto-reload
+        uvicorn.run(
+            "app.main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            reload=True
+        )
+    else:
+        # Production: uvloop + httptools (state is per-process, see settings.api_workers)
+        uvicorn.run(
+            "app.main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            workers=settings.api_workers,
+            loop="uvloop",
+            http="httptools",
+            log_config=None
+        )
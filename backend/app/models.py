@@ -1,25 +1,38 @@
 """Pydantic models for API request/response validation."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 
 
-class ChatMessage(BaseModel):
-    """Chat message model."""
-    role: str = Field(..., description="Message role: 'user' or 'assistant'")
-    content: str = Field(..., description="Message content")
+class FrozenModel(BaseModel):
+    """Base for models built on every request: immutable and tolerant of extra keys."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class ChatMessage(FrozenModel):
+    """Chat message model (role is 'user' or 'assistant')."""
+    role: str
+    content: str
     timestamp: Optional[datetime] = None
 
 
-class ChatRequest(BaseModel):
+class ChatRequest(FrozenModel):
     """Request model for sending a chat message."""
     session_id: str = Field(..., description="Chat session ID")
     message: str = Field(..., min_length=1, description="User message")
     use_knowledge_base: bool = Field(True, description="Whether to use the vector knowledge base")
     use_reranking: bool = Field(False, description="Whether to use Cross-Encoder reranking")
+    
+    @field_validator("message")
+    @classmethod
+    def message_not_blank(cls, value: str) -> str:
+        """Reject whitespace-only messages, which min_length alone lets through."""
+        if not value.strip():
+            raise ValueError("message must not be blank")
+        return value
 
 
-class RerankResult(BaseModel):
+class RerankResult(FrozenModel):
     """Details of a reranked document."""
     initial_rank: int
     final_rank: int
@@ -28,7 +41,7 @@ class RerankResult(BaseModel):
     page: Optional[str] = "N/A"
 
 
-class ChatResponse(BaseModel):
+class ChatResponse(FrozenModel):
     """Response model for chat endpoint."""
     session_id: str
     user_message: ChatMessage
@@ -42,7 +55,7 @@ class SessionCreate(BaseModel):
     name: Optional[str] = Field(None, description="Optional session name")
 
 
-class Session(BaseModel):
+class Session(FrozenModel):
     """Session model."""
     id: str
     name: str
@@ -65,7 +78,7 @@ class IngestionRequest(BaseModel):
     max_memory_messages: Optional[int] = Field(None, description="Chat memory window size")
 
 
-class IngestionResponse(BaseModel):
+class IngestionResponse(FrozenModel):
     """Response model for document ingestion."""
     total_files: int
     new_files_processed: int
@@ -81,6 +94,25 @@ class IngestionStatus(BaseModel):
     file_path: str
     ingestion_date: datetime
     chunk_count: int
+    job_id: Optional[str] = None
+
+
+class IngestionJobResponse(BaseModel):
+    """Response model for a queued ingestion job."""
+    job_id: str
+    status: str
+
+
+class IngestionJobStatus(BaseModel):
+    """Progress and outcome of an ingestion job."""
+    job_id: str
+    status: str = Field(..., description="queued, running, completed or failed")
+    progress: float = Field(0.0, description="Fraction of files processed (0-1)")
+    chunks_created: int = 0
+    error: Optional[str] = None
+    result: Optional[IngestionResponse] = Field(None, description="Ingestion statistics once completed")
+    created_at: datetime
+    updated_at: datetime
 
 
 class HealthResponse(BaseModel):
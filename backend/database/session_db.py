@@ -1,8 +1,16 @@
 """SQLite database for session and document metadata storage."""
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, event, func, insert, text, update, Column, String, Integer, Float, DateTime, ForeignKey, Text, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker, relationship, load_only
+from cachetools import TTLCache
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
+from typing import Any, Dict, List, Tuple
+import orjson
+import threading
 import uuid
 from app.config import settings
 import logging
@@ -11,6 +19,32 @@ logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Lightweight message row returned by get_session_with_messages
+StoredMessage = namedtuple('StoredMessage', ['id', 'session_id', 'role', 'content', 'timestamp', 'rerank_summary'])
+
+# At most one ingestion job may be queued or running; a constant-expression partial
+# unique index lets the database reject a second one atomically
+_ACTIVE_JOB_STATUSES = ('queued', 'running')
+_ONE_ACTIVE_JOB_INDEX = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_ingestion_jobs_one_active ON ingestion_jobs ((1)) "
+    "WHERE status IN ('queued', 'running')"
+)
+
+# Rows per multi-row INSERT, keeps bound parameters under SQLite's 999 variable limit
+_BULK_INSERT_BATCH = 100
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Enable WAL, relaxed fsync and in-memory caches on every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Readers no longer block on the writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Fsync at checkpoints instead of every commit
+    cursor.execute("PRAGMA cache_size=-64000")  # 64 MB page cache
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped I/O
+    cursor.execute("PRAGMA temp_store=MEMORY")  # Sorts and temp indexes stay off disk
+    cursor.execute("PRAGMA foreign_keys=ON")  # Let ON DELETE CASCADE remove a session's messages
+    cursor.close()
+
 
 class ChatSession(Base):
     """Chat session model."""
@@ -18,11 +52,13 @@ class ChatSession(Base):
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Python defaults keep inserts working on tables created before the server defaults existed
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
     
     # Relationship to messages
-    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
+    # passive_deletes leaves child rows to the FK's ON DELETE CASCADE instead of loading them first
+    messages = relationship("Message", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Message(Base):
@@ -34,10 +70,16 @@ class Message(Base):
     role = Column(String, nullable=False)  # 'user' or 'assistant'
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    rerank_summary = Column(Text, nullable=True)  # JSON string of auditing data
+    # Auditing data, stored as JSON text and decoded by the column type on every read
+    rerank_summary = Column(JSON(none_as_null=True), nullable=True)
     
     # Relationship to session
     session = relationship("ChatSession", back_populates="messages")
+    
+    # Serves "latest N messages of a session" straight from the index
+    __table_args__ = (
+        Index('ix_messages_session_ts', 'session_id', 'timestamp'),
+    )
 
 
 class DocumentMetadata(Base):
@@ -47,9 +89,32 @@ class DocumentMetadata(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     filename = Column(String, nullable=False, unique=True)
     file_hash = Column(String, nullable=False)
+    hash_algorithm = Column(String, nullable=True)  # NULL for rows hashed with SHA-256 before blake3
     file_path = Column(String, nullable=False)
     ingestion_date = Column(DateTime, default=datetime.utcnow)
     chunk_count = Column(Integer, nullable=False)
+    job_id = Column(String, nullable=True)  # Ingestion job that last processed the file
+    size = Column(Integer, nullable=True)  # File size in bytes when ingested
+    mtime_ns = Column(Integer, nullable=True)  # File modification time when ingested
+    
+    # Not unique: identical files may be ingested under different names
+    __table_args__ = (
+        Index('ix_doc_file_hash', 'file_hash'),
+    )
+
+
+class IngestionJob(Base):
+    """Background ingestion job and its progress."""
+    __tablename__ = 'ingestion_jobs'
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = Column(String, nullable=False, default='queued')  # queued, running, completed, failed
+    progress = Column(Float, nullable=False, default=0.0)  # Fraction of files processed
+    chunks_created = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    result = Column(Text, nullable=True)  # JSON string of the final ingestion statistics
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class SessionDatabase:
@@ -57,24 +122,60 @@ class SessionDatabase:
     
     def __init__(self):
         """Initialize database connection and create tables."""
-        db_path = settings.get_absolute_path(settings.session_db_path)
-        self.engine = create_engine(f'sqlite:///{db_path}', echo=False)
+        db_path = settings.session_db_path_abs
+        self.engine = create_engine(
+            f'sqlite:///{db_path}',
+            echo=False,
+            pool_size=settings.session_db_pool_size,
+            max_overflow=settings.session_db_max_overflow,
+            connect_args={"check_same_thread": False},
+            json_serializer=lambda value: orjson.dumps(value).decode(),
+            json_deserializer=orjson.loads
+        )
+        event.listen(self.engine, "connect", _set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        # Keep loaded attributes after commit so rows stay usable once the session closes
+        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
         
-        # Simple migration: add rerank_summary column if it doesn't exist
+        # Simple migrations: add columns introduced after the table was first created
+        migrations = [
+            ('messages', 'rerank_summary', 'TEXT'),
+            ('document_metadata', 'job_id', 'VARCHAR'),
+            ('document_metadata', 'size', 'INTEGER'),
+            ('document_metadata', 'mtime_ns', 'INTEGER'),
+            ('document_metadata', 'hash_algorithm', 'VARCHAR'),
+        ]
+        index_migrations = [
+            ('ix_messages_session_ts', 'messages', 'session_id, timestamp'),
+            ('ix_doc_file_hash', 'document_metadata', 'file_hash'),
+        ]
         try:
-            from sqlalchemy import text
             with self.engine.connect() as conn:
-                # Check if column exists
-                result = conn.execute(text("PRAGMA table_info(messages)"))
-                columns = [row[1] for row in result]
-                if 'rerank_summary' not in columns:
-                    logger.info("Migrating database: adding rerank_summary column to messages table")
-                    conn.execute(text("ALTER TABLE messages ADD COLUMN rerank_summary TEXT"))
-                    conn.commit()
+                for table, column, column_type in migrations:
+                    # Check if column exists
+                    result = conn.execute(text(f"PRAGMA table_info({table})"))
+                    columns = [row[1] for row in result]
+                    if column not in columns:
+                        logger.info(f"Migrating database: adding {column} column to {table} table")
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+                        conn.commit()
+                
+                # create_all skips existing tables, so add indexes introduced later explicitly
+                for index_name, table, columns in index_migrations:
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"))
+                conn.commit()
         except Exception as e:
             logger.warning(f"Database migration check failed (might be fine if already migrated): {e}")
+        self._ensure_one_active_job_index()
+
+        # Read caches for hot point lookups, invalidated by the write methods below
+        self._cache_lock = threading.Lock()
+        self._session_cache = TTLCache(maxsize=256, ttl=30)
+        self._messages_cache = TTLCache(maxsize=256, ttl=30)
+        # Write generations: bumped on every invalidation so a read that overlapped
+        # a write does not put its stale result back in the cache
+        self._global_generation = 0
+        self._session_generations: Dict[str, int] = {}
 
         logger.info(f"Initialized database at {db_path}")
     
@@ -82,7 +183,53 @@ class SessionDatabase:
         """Get a new database session."""
         return self.SessionLocal()
     
-    # ===== Session Methods =====
+    @contextmanager
+    def session_scope(self):
+        """
+        Provide a transactional scope around a series of operations.
+        
+        Commits once when the block exits, rolls back on error and always
+        closes the session, so several writes share one connection checkout
+        and one transaction.
+        
+        Yields:
+            Database session
+        """
+        db = self.get_session()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def _scope(self, db=None):
+        """Reuse the caller's session if given, otherwise open a new transactional scope."""
+        return nullcontext(db) if db is not None else self.session_scope()
+    
+    def _generation(self, session_id: str) -> Tuple[int, int]:
+        """Current write generation of a session; call with _cache_lock held."""
+        return self._global_generation, self._session_generations.get(session_id, 0)
+    
+    def _cache_generation(self, session_id: str) -> Tuple[int, int]:
+        """Snapshot a session's write generation before reading it from the database."""
+        with self._cache_lock:
+            return self._generation(session_id)
+    
+    def _invalidate_session(self, session_id: str = None) -> None:
+        """Drop cached session rows and messages for one session, or for all sessions."""
+        with self._cache_lock:
+            if session_id is None:
+                self._global_generation += 1
+                self._session_cache.clear()
+                self._messages_cache.clear()
+                return
+            self._session_generations[session_id] = self._session_generations.get(session_id, 0) + 1
+            self._session_cache.pop(session_id, None)
+            for key in [key for key in self._messages_cache if key[0] == session_id]:
+                self._messages_cache.pop(key, None)
     
     def create_session(self, name: str = None) -> ChatSession:
         """Create a new chat session."""
@@ -109,95 +256,292 @@ class SessionDatabase:
         finally:
             db.close()
     
-    def get_session_by_id(self, session_id: str):
-        """Get a specific session by ID."""
+    def get_all_sessions_as_dicts(self) -> list:
+        """Get all chat sessions as plain dicts, selecting only the listed columns."""
         db = self.get_session()
         try:
-            session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-            return session
+            rows = (
+                db.query(ChatSession.id, ChatSession.name, ChatSession.created_at, ChatSession.updated_at)
+                .order_by(ChatSession.updated_at.desc())
+                .all()
+            )
+            return [row._asdict() for row in rows]
         finally:
             db.close()
     
-    def delete_session(self, session_id: str) -> bool:
-        """Delete a session and all its messages."""
+    def get_session_by_id(self, session_id: str):
+        """Get a specific session by ID, served from a short-lived cache when possible."""
+        with self._cache_lock:
+            session = self._session_cache.get(session_id)
+        if session is not None:
+            return session
+        
+        generation = self._cache_generation(session_id)
         db = self.get_session()
         try:
             session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-            if session:
-                db.delete(session)
-                db.commit()
-                logger.info(f"Deleted session: {session_id}")
-                return True
-            return False
         finally:
             db.close()
+        
+        if session is not None:
+            with self._cache_lock:
+                # Skip the fill if a write landed while this read was in flight
+                if self._generation(session_id) == generation:
+                    self._session_cache[session_id] = session
+        return session
+    
+    def get_session_with_messages(self, session_id: str):
+        """
+        Get a session and all its messages in one LEFT JOIN round-trip.
+        
+        Args:
+            session_id: Session ID
             
-    def delete_all_sessions(self) -> int:
-        """Delete all chat sessions and their messages."""
+        Returns:
+            Tuple of (session dict, StoredMessage list in chronological order with
+            rerank_summary already parsed), or (None, []) if the session does not exist
+        """
         db = self.get_session()
         try:
-            count = db.query(ChatSession).delete()
-            db.commit()
-            logger.info(f"Deleted all sessions: {count} sessions removed")
-            return count
+            rows = (
+                db.query(
+                    ChatSession.id,
+                    ChatSession.name,
+                    ChatSession.created_at,
+                    ChatSession.updated_at,
+                    Message.id.label('message_id'),
+                    Message.role,
+                    Message.content,
+                    Message.timestamp,
+                    Message.rerank_summary
+                )
+                .outerjoin(Message, Message.session_id == ChatSession.id)
+                .filter(ChatSession.id == session_id)
+                # Messages of one turn share a timestamp, so break ties by insertion order
+                .order_by(Message.timestamp, Message.id)
+                .all()
+            )
         finally:
             db.close()
+        
+        if not rows:
+            return None, []
+        
+        first = rows[0]
+        session = {
+            "id": first.id,
+            "name": first.name,
+            "created_at": first.created_at,
+            "updated_at": first.updated_at
+        }
+        # A session without messages yields one row with NULL message columns
+        messages = [
+            StoredMessage(
+                row.message_id,
+                session_id,
+                row.role,
+                row.content,
+                row.timestamp,
+                row.rerank_summary
+            )
+            for row in rows
+            if row.role is not None
+        ]
+        return session, messages
     
-    # ===== Message Methods =====
-    
-    def add_message(self, session_id: str, role: str, content: str, rerank_summary: list = None) -> Message:
-        """Add a message to a session with optional reranking audit data."""
-        import json
+    def get_recent_sessions_messages(self, limit: int) -> Dict[str, list]:
+        """
+        Get the messages of the most recently updated sessions in one query.
+        
+        Args:
+            limit: Number of sessions to load, newest by updated_at first
+            
+        Returns:
+            Dict of session ID to (role, content) rows in chronological order,
+            ordered from the most to the least recently updated session
+        """
         db = self.get_session()
         try:
-            summary_json = json.dumps(rerank_summary) if rerank_summary else None
-            message = Message(
-                session_id=session_id, 
-                role=role, 
-                content=content,
-                rerank_summary=summary_json
+            recent = (
+                db.query(ChatSession.id, ChatSession.updated_at)
+                .order_by(ChatSession.updated_at.desc())
+                .limit(limit)
+                .subquery()
+            )
+            rows = (
+                db.query(recent.c.id, Message.role, Message.content)
+                .outerjoin(Message, Message.session_id == recent.c.id)
+                # Messages of one turn share a timestamp, so break ties by insertion order
+                .order_by(recent.c.updated_at.desc(), recent.c.id, Message.timestamp, Message.id)
+                .all()
             )
-            db.add(message)
-            
-            # Update session's updated_at timestamp
-            session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-            if session:
-                session.updated_at = datetime.utcnow()
-            
-            db.commit()
-            db.refresh(message)
-            return message
         finally:
             db.close()
-
-    def update_session_name(self, session_id: str, name: str) -> bool:
-        """Update the name of a chat session."""
+        
+        sessions: Dict[str, list] = {}
+        for row in rows:
+            messages = sessions.setdefault(row.id, [])
+            # A session without messages yields one row with NULL message columns
+            if row.role is not None:
+                messages.append(row)
+        return sessions
+    
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session and all its messages."""
         db = self.get_session()
         try:
             session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
             if session:
-                session.name = name
-                session.updated_at = datetime.utcnow()
+                db.delete(session)
                 db.commit()
+                self._invalidate_session(session_id)
+                logger.info(f"Deleted session: {session_id}")
                 return True
             return False
         finally:
             db.close()
+            
+    def delete_all_sessions(self) -> int:
+        """Delete all chat sessions and their messages with two set-based DELETEs in one transaction."""
+        with self.session_scope() as db:
+            db.execute(text("DELETE FROM messages"))
+            count = db.execute(text("DELETE FROM chat_sessions")).rowcount
+        
+        self._invalidate_session()
+        logger.info(f"Deleted all sessions: {count} sessions removed")
+        return count
     
-    def get_session_messages(self, session_id: str, limit: int = None):
-        """Get messages for a session, optionally limited to most recent."""
+    # ===== Message Methods =====
+    
+    def add_messages_bulk(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Insert many messages in one transaction.
+        
+        Args:
+            rows: Dicts with session_id, role, content and optional timestamp
+                and rerank_summary (list, serialized to JSON by the column type)
+            
+        Returns:
+            Number of messages inserted
+        """
+        if not rows:
+            return 0
+        
+        now = datetime.utcnow()
+        mappings = []
+        latest = {}
+        for row in rows:
+            timestamp = row.get('timestamp') or now
+            summary = row.get('rerank_summary')
+            mappings.append({
+                'session_id': row['session_id'],
+                'role': row['role'],
+                'content': row['content'],
+                'timestamp': timestamp,
+                'rerank_summary': summary or None
+            })
+            latest[row['session_id']] = max(latest.get(row['session_id'], timestamp), timestamp)
+        
+        with self.session_scope() as db:
+            db.bulk_insert_mappings(Message, mappings)
+            # Bump each touched session's updated_at once
+            for session_id, timestamp in latest.items():
+                db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.id == session_id)
+                    .values(updated_at=timestamp)
+                )
+        
+        for session_id in latest:
+            self._invalidate_session(session_id)
+        return len(mappings)
+
+    def begin_turn(self, session_id: str, content: str, timestamp: datetime = None, store_message: bool = True):
+        """
+        Start a chat turn in a single transaction.
+        
+        Fetches the session, then stores the new user message and bumps the
+        session's updated_at.
+        
+        Args:
+            session_id: Session ID
+            content: User message content
+            timestamp: Optional message timestamp (defaults to now)
+            store_message: Pass False to only look the session up
+            
+        Returns:
+            The session, or None if it does not exist
+        """
+        with self.session_scope() as db:
+            session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+            if not session or not store_message:
+                return session
+            
+            timestamp = timestamp or datetime.utcnow()
+            # One INSERT ... RETURNING statement, no ORM flush or refresh for the message
+            message_id = db.execute(
+                insert(Message)
+                .values(session_id=session_id, role="user", content=content, timestamp=timestamp)
+                .returning(Message.id)
+            ).scalar_one()
+            session.updated_at = timestamp
+        
+        self._invalidate_session(session_id)
+        logger.debug("Stored user message %s in session %s", message_id, session_id)
+        return session
+
+    def update_session_name(self, session_id: str, name: str, db=None) -> bool:
+        """Update the name of a chat session, optionally inside the caller's session_scope()."""
+        with self._scope(db) as db:
+            session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+            if not session:
+                return False
+            session.name = name
+            session.updated_at = datetime.utcnow()
+        
+        self._invalidate_session(session_id)
+        return True
+    
+    def get_session_messages(self, session_id: str, limit: int = None, include_rerank_summary: bool = True):
+        """
+        Get messages for a session, optionally limited to most recent.
+        
+        Args:
+            session_id: Session ID
+            limit: Optional number of most recent messages to return
+            include_rerank_summary: Load the audit JSON column; skip it when only the conversation is needed
+            
+        Returns:
+            Messages in chronological order
+        """
+        cache_key = (session_id, limit, include_rerank_summary)
+        with self._cache_lock:
+            messages = self._messages_cache.get(cache_key)
+        if messages is not None:
+            return list(messages)
+        
+        generation = self._cache_generation(session_id)
         db = self.get_session()
         try:
-            query = db.query(Message).filter(Message.session_id == session_id).order_by(Message.timestamp)
+            query = db.query(Message).filter(Message.session_id == session_id)
+            if not include_rerank_summary:
+                query = query.options(load_only(Message.role, Message.content, Message.timestamp))
             
             if limit:
-                # Get the last N messages
-                all_messages = query.all()
-                return all_messages[-limit:] if len(all_messages) > limit else all_messages
+                # Fetch only the last N rows, newest first, then restore chronological order
+                rows = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit).all()
+                messages = list(reversed(rows))
             else:
-                return query.all()
+                # Messages of one turn share a timestamp, so break ties by insertion order
+                messages = query.order_by(Message.timestamp, Message.id).all()
         finally:
             db.close()
+        
+        with self._cache_lock:
+            # Skip the fill if a write landed while this read was in flight
+            if self._generation(session_id) == generation:
+                self._messages_cache[cache_key] = messages
+        return list(messages)
     
     # ===== Document Metadata Methods =====
     
@@ -210,52 +554,171 @@ class SessionDatabase:
         finally:
             db.close()
     
-    def get_document_by_hash(self, file_hash: str):
-        """Get document metadata by file hash."""
+    def add_documents_bulk(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Add or update metadata for many documents in one transaction.
+        
+        Uses INSERT ... ON CONFLICT(filename) DO UPDATE instead of a lookup
+        and an insert per file.
+        
+        Args:
+            rows: Dicts with filename, file_hash, file_path, chunk_count and optional
+                job_id, size, mtime_ns and hash_algorithm
+            
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+        
+        now = datetime.utcnow()
+        values = [
+            {
+                'filename': row['filename'],
+                'file_hash': row['file_hash'],
+                'hash_algorithm': row.get('hash_algorithm'),
+                'file_path': row['file_path'],
+                'chunk_count': row['chunk_count'],
+                'job_id': row.get('job_id'),
+                'size': row.get('size'),
+                'mtime_ns': row.get('mtime_ns'),
+                'ingestion_date': now
+            }
+            for row in rows
+        ]
+        
+        with self.session_scope() as db:
+            for start in range(0, len(values), _BULK_INSERT_BATCH):
+                stmt = sqlite_insert(DocumentMetadata).values(values[start:start + _BULK_INSERT_BATCH])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['filename'],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in (
+                            'file_hash', 'hash_algorithm', 'file_path', 'chunk_count',
+                            'job_id', 'size', 'mtime_ns', 'ingestion_date'
+                        )
+                    }
+                )
+                db.execute(stmt)
+        
+        logger.info(f"Stored metadata for {len(values)} documents")
+        return len(values)
+    
+    def delete_all_documents(self) -> int:
+        """Delete all document metadata with a single DELETE."""
+        with self.session_scope() as db:
+            count = db.execute(text("DELETE FROM document_metadata")).rowcount
+        
+        logger.info(f"Deleted metadata for {count} documents")
+        return count
+    
+    def get_all_documents(self):
+        """Get all ingested document metadata."""
         db = self.get_session()
         try:
-            doc = db.query(DocumentMetadata).filter(DocumentMetadata.file_hash == file_hash).first()
-            return doc
+            docs = db.query(DocumentMetadata).order_by(DocumentMetadata.ingestion_date.desc()).all()
+            return docs
         finally:
             db.close()
+
+    
+    # ===== Ingestion Job Methods =====
+    
+    def _ensure_one_active_job_index(self) -> None:
+        """Create the index that allows only one queued or running ingestion job."""
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text(_ONE_ACTIVE_JOB_INDEX))
+                conn.commit()
+        except Exception as e:
+            # Fails while a previous process left several jobs active; retried once they are failed
+            logger.warning(f"Could not create the single active ingestion job index: {e}")
+    
+    def start_ingestion_job(self) -> Tuple[IngestionJob, bool]:
+        """
+        Create a queued ingestion job unless one is already queued or running.
+        
+        The check and the insert share one transaction, and the partial unique
+        index rejects a job created concurrently by another request.
+        
+        Returns:
+            Tuple of (job, created): the new job and True, or the active job and False
+        """
+        try:
+            with self.session_scope() as db:
+                active = self._active_ingestion_job(db)
+                if active:
+                    return active, False
+                job = IngestionJob()
+                db.add(job)
+        except IntegrityError:
+            # Another request created the active job between our check and insert
+            active = self.get_active_ingestion_job()
+            if active:
+                return active, False
+            raise
+        
+        logger.info(f"Created ingestion job: {job.id}")
+        return job, True
     
-    def add_document_metadata(self, filename: str, file_hash: str, file_path: str, chunk_count: int):
-        """Add or update document metadata."""
+    def update_ingestion_job(self, job_id: str, **fields) -> bool:
+        """Update status, progress or results of an ingestion job."""
         db = self.get_session()
         try:
-            # Check if document already exists
-            doc = db.query(DocumentMetadata).filter(DocumentMetadata.filename == filename).first()
-            
-            if doc:
-                # Update existing document
-                doc.file_hash = file_hash
-                doc.file_path = file_path
-                doc.chunk_count = chunk_count
-                doc.ingestion_date = datetime.utcnow()
-            else:
-                # Create new document metadata
-                doc = DocumentMetadata(
-                    filename=filename,
-                    file_hash=file_hash,
-                    file_path=file_path,
-                    chunk_count=chunk_count
-                )
-                db.add(doc)
-            
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            if not job:
+                return False
+            for key, value in fields.items():
+                setattr(job, key, value)
             db.commit()
-            db.refresh(doc)
-            return doc
+            return True
         finally:
             db.close()
     
-    def get_all_documents(self):
-        """Get all ingested document metadata."""
+    def get_ingestion_job(self, job_id: str):
+        """Get an ingestion job by ID."""
         db = self.get_session()
         try:
-            docs = db.query(DocumentMetadata).order_by(DocumentMetadata.ingestion_date.desc()).all()
-            return docs
+            return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+        finally:
+            db.close()
+    
+    def fail_interrupted_ingestion_jobs(self) -> int:
+        """Mark jobs left queued or running by a previous process as failed."""
+        db = self.get_session()
+        try:
+            count = (
+                db.query(IngestionJob)
+                .filter(IngestionJob.status.in_(_ACTIVE_JOB_STATUSES))
+                .update({'status': 'failed', 'error': 'Interrupted by server restart'}, synchronize_session=False)
+            )
+            db.commit()
+            if count:
+                logger.warning(f"Marked {count} interrupted ingestion jobs as failed")
         finally:
             db.close()
+        
+        # No job is active any more, so the index can always be created now
+        self._ensure_one_active_job_index()
+        return count
+    
+    def get_active_ingestion_job(self):
+        """Get the most recent queued or running ingestion job, if any."""
+        db = self.get_session()
+        try:
+            return self._active_ingestion_job(db)
+        finally:
+            db.close()
+    
+    def _active_ingestion_job(self, db):
+        """Query the most recent queued or running ingestion job within the caller's session."""
+        return (
+            db.query(IngestionJob)
+            .filter(IngestionJob.status.in_(_ACTIVE_JOB_STATUSES))
+            .order_by(IngestionJob.created_at.desc())
+            .first()
+        )
 
 
 # Global database instance
@@ -0,0 +1,41 @@
+"""
+Export the Cross-Encoder reranker to an int8-quantized ONNX model.
+
+Requires the optional packages: pip install "optimum[onnxruntime]"
+Then set CROSS_ENCODER_BACKEND=onnx to serve reranking from ONNX Runtime.
+"""
+import sys
+import os
+
+# Add the current directory to the path so we can import our services
+sys.path.append(os.getcwd())
+
+from app.config import settings
+
+MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def export_reranker(output_dir: str = None):
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+    
+    output_dir = output_dir or settings.cross_encoder_onnx_dir
+    
+    print(f"📦 Exporting {MODEL_NAME} to ONNX...")
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(output_dir)
+    
+    print("🔧 Applying dynamic int8 quantization...")
+    quantizer = ORTQuantizer.from_pretrained(output_dir)
+    quantizer.quantize(
+        save_dir=output_dir,
+        quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    )
+    
+    print(f"\n✨ Done! Quantized model written to {output_dir}")
+    print("Set CROSS_ENCODER_BACKEND=onnx to use it.")
+
+if __name__ == "__main__":
+    export_reranker(sys.argv[1] if len(sys.argv) > 1 else None)
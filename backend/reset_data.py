@@ -5,7 +5,7 @@ import os
 sys.path.append(os.getcwd())
 
 from services.vector_store import vector_store
-from database.session_db import session_db, DocumentMetadata
+from database.session_db import session_db
 from app.config import settings
 
 def reset_all_data():
@@ -14,17 +14,11 @@ def reset_all_data():
     # 1. Clear ChromaDB
     try:
         print(f"🧹 Clearing ChromaDB collection: {settings.collection_name}...")
-        count_before = vector_store.get_collection_count()
+        # Drop and recreate the collection instead of fetching and deleting every ID
+        num_deleted = vector_store.reset()
         
-        # Delete all documents by passing all IDs
-        # If the collection is large, we might need a different approach, 
-        # but for 144 docs this is fine.
-        results = vector_store.collection.get()
-        ids = results.get('ids', [])
-        
-        if ids:
-            vector_store.collection.delete(ids=ids)
-            print(f"✅ Deleted {len(ids)} documents from ChromaDB.")
+        if num_deleted:
+            print(f"✅ Deleted {num_deleted} documents from ChromaDB.")
         else:
             print("ℹ️ ChromaDB was already empty.")
             
@@ -34,16 +28,8 @@ def reset_all_data():
     # 2. Clear Document Metadata in SQLite
     try:
         print("🧹 Clearing document metadata from SQLite...")
-        db = session_db.get_session()
-        try:
-            num_deleted = db.query(DocumentMetadata).delete()
-            db.commit()
-            print(f"✅ Deleted {num_deleted} records from DocumentMetadata table.")
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
+        num_deleted = session_db.delete_all_documents()
+        print(f"✅ Deleted {num_deleted} records from DocumentMetadata table.")
             
     except Exception as e:
         print(f"❌ Error clearing SQLite metadata: {e}")
@@ -1,27 +1,104 @@
 """AWS Bedrock client for LLM and embedding generation."""
+import asyncio
 import boto3
-import json
-from typing import List, Dict, Any
+from cachetools import LRUCache
+from botocore.config import Config
+import hashlib
+import numpy as np
+import orjson
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from itertools import dropwhile, groupby
+from operator import itemgetter
+from typing import Callable, Iterator, List, Dict, Any, Tuple
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+_KB_SYSTEM_PROMPT = """You are a helpful, professional assistant that uses a knowledge base to answer questions.
+
+GROUNDING RULES:
+1. For factual questions, use ONLY the provided "Context from knowledge base".
+2. PRIORITIZE the current "Context from knowledge base" even if it contradicts your previous answers in the conversation history. The knowledge base context can change or be updated between turns.
+3. If the answer is in the current context, provide it fully, even if you previously said it wasn't available. Address EVERY part of a multi-point question.
+4. If the answer for a specific part is missing, answer the other parts and state clearly which part is unavailable in the knowledge base.
+5. If the entire answer is missing, say: "I don't have enough information in my knowledge base to answer that question."
+6. DO NOT hallucinate. Be direct and concise.
+7. You may use information from the "Conversation History" to answer questions about the session context (e.g., user's name or what was previously discussed), but strictly rely on the "Context from knowledge base" for technical answers.
+7. For casual chat or greetings, ignore the knowledge base and answer naturally. """
+
+_NO_KB_SYSTEM_PROMPT = """You are a helpful assistant. Knowledge base access is currently DISABLED.
+
+RULES:
+1. For greetings or casual chat, answer naturally.
+2. For factual questions, politely state: "Please enable the Knowledge Base in the UI to ask questions about the documents."
+3. DO NOT use internal knowledge for factual questions when access is disabled."""
+
+# Marks the end of a prompt prefix Bedrock may cache between turns
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+# Assistant replies that admit missing knowledge; kept out of history to avoid grounding bias
+_FAILURE_RE = re.compile(
+    r"don't have enough information|not in my knowledge base|enable the knowledge base|unavailable in the knowledge base",
+    re.IGNORECASE
+)
+
+# Maximum number of texts Cohere embed models accept per request
+_COHERE_EMBED_BATCH_SIZE = 96
+
+
+# Storage precision of cached embeddings; rows are upcast to float32 when returned
+_CACHE_DTYPES = {"fp32": np.float32, "fp16": np.float16, "int8": np.int8}
+
+
+def _embedding_key(text: str) -> bytes:
+    """Content-address a text for the embedding cache."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+@cache
+def _get_bedrock_runtime():
+    """
+    Create the shared bedrock-runtime client once per process.
+    
+    Credential discovery, endpoint resolution and loading the botocore
+    service model happen here, so every caller reuses that work.
+    """
+    # Size the connection pool for parallel embedding calls and back off on throttling
+    return boto3.session.Session().client(
+        'bedrock-runtime',
+        region_name=settings.aws_region,
+        config=Config(
+            max_pool_connections=settings.bedrock_max_pool_connections,
+            tcp_keepalive=True,  # Keep pooled TLS connections alive between calls
+            retries={"max_attempts": 6, "mode": "adaptive"}
+        )
+    )
+
 
 class BedrockClient:
     """Client for AWS Bedrock API interactions."""
     
     def __init__(self):
         """Initialize Bedrock runtime client."""
-        self.client = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=settings.aws_region
-        )
+        self.client = _get_bedrock_runtime()
         self.model_id = settings.aws_bedrock_model_id
         self.embedding_model_id = settings.aws_bedrock_embedding_model_id
+        # Cohere models embed a list of texts per request, Titan only one
+        self.supports_batch_embedding = self.embedding_model_id.startswith("cohere.embed")
+        # Created on first async use so they bind to the running event loop
+        self._async_semaphore = None
+        self._async_executor = None
+        # Embeddings of recently seen texts, keyed by content hash
+        self._embed_cache = LRUCache(maxsize=settings.embedding_cache_size)
+        self._embed_cache_dtype = _CACHE_DTYPES[settings.embedding_cache_dtype]
+        self._embed_cache_lock = threading.Lock()
         logger.info(f"Initialized Bedrock client with model: {self.model_id}")
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding vector for given text using Amazon Titan.
         
@@ -29,16 +106,18 @@ class BedrockClient:
             text: Text to embed
             
         Returns:
-            Embedding vector as list of floats
+            Embedding vector as a float32 array
         """
         try:
             if not text or not text.strip():
                 # Return zero vector for empty text to avoid API errors
-                # Titan embeddings are 1536 dims
-                return [0.0] * 1536
+                return np.zeros(settings.embedding_dimensions, dtype=np.float32)
+
+            if self.supports_batch_embedding:
+                return self._generate_embedding_batch([text])[0]
 
             # Titan embedding request format
-            request_body = json.dumps({
+            request_body = orjson.dumps({
                 "inputText": text
             })
             
@@ -49,65 +128,232 @@ class BedrockClient:
                 accept='application/json'
             )
             
-            response_body = json.loads(response['body'].read())
-            embedding = response_body.get('embedding', [])
-            return embedding
+            response_body = orjson.loads(response['body'].read())
+            return np.asarray(response_body.get('embedding', []), dtype=np.float32)
             
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
             raise
 
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def _generate_embedding_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed up to 96 texts in a single Cohere embed request.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            float32 array of shape (len(texts), embedding_dimensions) in the same order as texts
+        """
+        embeddings = np.zeros((len(texts), settings.embedding_dimensions), dtype=np.float32)
+        # Cohere rejects empty strings, keep zero vectors for them
+        indices = [i for i, text in enumerate(texts) if text and text.strip()]
+        if not indices:
+            return embeddings
+        
+        request_body = orjson.dumps({
+            "texts": [texts[i] for i in indices],
+            "input_type": "search_document"
+        })
+        
+        response = self.client.invoke_model(
+            modelId=self.embedding_model_id,
+            body=request_body,
+            contentType='application/json',
+            accept='application/json'
+        )
+        
+        response_body = orjson.loads(response['body'].read())
+        embeddings[indices] = np.asarray(response_body.get('embeddings', []), dtype=np.float32)
+        return embeddings
+
+    def _embedding_batcher(self) -> Tuple[int, Callable[[List[str]], np.ndarray]]:
+        """
+        Return the request batch size and the function that embeds one batch.
+        
+        The function's result is assigned into a row slice of the output
+        array; Titan's single vector broadcasts into its one-row slice.
+        """
+        if self.supports_batch_embedding:
+            return _COHERE_EMBED_BATCH_SIZE, self._generate_embedding_batch
+        return 1, lambda batch: self.generate_embedding(batch[0])
+
+    def _lookup_cached_embeddings(self, texts: List[str]) -> Tuple[List[bytes], Dict[bytes, np.ndarray], Dict[bytes, str]]:
+        """
+        Split texts into cached embeddings and distinct texts still to embed.
+        
+        Returns:
+            Tuple of (cache key per input text, cached embeddings by key, uncached texts by key)
+        """
+        keys = [_embedding_key(text) for text in texts]
+        cached = {}
+        missing = {}
+        with self._embed_cache_lock:
+            for key, text in zip(keys, texts):
+                if key in cached or key in missing:
+                    continue
+                entry = self._embed_cache.get(key)
+                if entry is not None:
+                    cached[key] = self._decode_cached(entry)
+                else:
+                    missing[key] = text
+        return keys, cached, missing
+
+    def _cache_embeddings(self, keys: List[bytes], embeddings: np.ndarray) -> Dict[bytes, np.ndarray]:
+        """Store freshly generated embeddings, skipping zero-vector fallbacks, and return them by key."""
+        generated = dict(zip(keys, embeddings))
+        with self._embed_cache_lock:
+            for key, embedding in generated.items():
+                if embedding.any():
+                    self._embed_cache[key] = self._encode_cached(embedding)
+        return generated
+
+    def _encode_cached(self, embedding: np.ndarray):
+        """Convert an embedding to the configured cache precision (int8 keeps a per-vector scale)."""
+        if self._embed_cache_dtype is np.int8:
+            # Symmetric quantization: the largest component maps to +/-127
+            scale = np.float32(np.abs(embedding).max() / 127.0)
+            return np.round(embedding / scale).astype(np.int8), scale
+        return embedding.astype(self._embed_cache_dtype, copy=False)
+
+    def _decode_cached(self, entry) -> np.ndarray:
+        """Restore a cached entry to a float32 embedding."""
+        if isinstance(entry, tuple):
+            quantized, scale = entry
+            return quantized.astype(np.float32) * scale
+        return entry
+
+    def _gather_embeddings(self, keys: List[bytes], embeddings: Dict[bytes, np.ndarray]) -> np.ndarray:
+        """Scatter embeddings by key back into a contiguous array in input order."""
+        out = np.empty((len(keys), settings.embedding_dimensions), dtype=np.float32)
+        for i, key in enumerate(keys):
+            out[i] = embeddings[key]
+        return out
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts, embedding each distinct uncached text once.
+        
+        Args:
+            texts: List of strings to embed
+            
+        Returns:
+            float32 array of shape (len(texts), embedding_dimensions)
+        """
+        if not texts:
+            return np.empty((0, settings.embedding_dimensions), dtype=np.float32)
+        
+        keys, embeddings, missing = self._lookup_cached_embeddings(texts)
+        if missing:
+            embeddings.update(self._cache_embeddings(list(missing), self._embed_texts(list(missing.values()))))
+        return self._gather_embeddings(keys, embeddings)
+
+    def _embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Generate embeddings for a list of texts in parallel.
         
+        Cohere models are called with batches of up to 96 texts per request;
+        Titan only accepts one text per request, so each text is its own batch.
+        
         Args:
             texts: List of strings to embed
             
         Returns:
-            List of embedding vectors
+            float32 array of shape (len(texts), embedding_dimensions)
         """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        from concurrent.futures import as_completed
         from tqdm import tqdm
-        
-        if not texts:
-            return []
 
-        logger.info(f"Generating embeddings for {len(texts)} chunks in parallel...")
+        batch_size, embed_batch = self._embedding_batcher()
+        
+        batch_starts = range(0, len(texts), batch_size)
+        logger.info(f"Generating embeddings for {len(texts)} chunks in {len(batch_starts)} requests...")
+        
+        # Parallelize across batches; 10-20 threads is usually safe for
+        # Bedrock default quotas (50 TPS) and fits the client connection pool
+        max_workers = min(15, settings.bedrock_max_pool_connections)
+        # Zero-filled so failed batches already hold the fallback vectors
+        embeddings = np.zeros((len(texts), settings.embedding_dimensions), dtype=np.float32)
         
-        # Parallelize using ThreadPoolExecutor
-        # 10-20 threads is usually safe for Bedrock default quotas (50 TPS)
-        max_workers = 15
-        embeddings = [None] * len(texts)
+        def embed_into(start: int) -> None:
+            # Each worker writes its own disjoint rows of the shared array
+            embeddings[start:start + batch_size] = embed_batch(texts[start:start + batch_size])
         
         with tqdm(total=len(texts), desc="✨ Generating Embeddings", unit="chunk") as pbar:
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Map original index to future to maintain order
-                future_to_idx = {
-                    executor.submit(self.generate_embedding, text): i 
-                    for i, text in enumerate(texts)
-                }
+                future_to_start = {executor.submit(embed_into, start): start for start in batch_starts}
                 
-                for future in as_completed(future_to_idx):
-                    idx = future_to_idx[future]
+                for future in as_completed(future_to_start):
+                    start = future_to_start[future]
+                    end = min(start + batch_size, len(texts))
                     try:
-                        embeddings[idx] = future.result()
+                        future.result()
                     except Exception as e:
-                        logger.error(f"Failed to generate embedding for chunk {idx}: {e}")
-                        # Provide a fallback zero vector so the whole batch doesn't fail
-                        embeddings[idx] = [0.0] * 1536
+                        # Leave zero vectors in place so the whole batch doesn't fail
+                        logger.error(f"Failed to generate embeddings for chunks {start}-{end - 1}: {e}")
                     
-                    pbar.update(1)
+                    pbar.update(end - start)
         
         return embeddings
     
+    async def generate_embeddings_async(self, texts: List[str]) -> np.ndarray:
+        """
+        Generate embeddings for a list of texts from async code.
+        
+        Requests are scheduled on the event loop and bounded by one semaphore
+        shared by all callers, so concurrent ingestion batches together keep
+        at most embedding_request_concurrency calls in flight.
+        
+        Args:
+            texts: List of strings to embed
+            
+        Returns:
+            float32 array of shape (len(texts), embedding_dimensions)
+        """
+        if not texts:
+            return np.empty((0, settings.embedding_dimensions), dtype=np.float32)
+        
+        keys, embeddings, missing = self._lookup_cached_embeddings(texts)
+        if missing:
+            generated = await self._embed_texts_async(list(missing.values()))
+            embeddings.update(self._cache_embeddings(list(missing), generated))
+        return self._gather_embeddings(keys, embeddings)
+
+    async def _embed_texts_async(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches on the event loop, bounded by the shared semaphore."""
+        if self._async_semaphore is None:
+            self._async_semaphore = asyncio.Semaphore(settings.embedding_request_concurrency)
+            self._async_executor = ThreadPoolExecutor(
+                max_workers=settings.embedding_request_concurrency,
+                thread_name_prefix="bedrock-embed"
+            )
+        
+        loop = asyncio.get_running_loop()
+        batch_size, embed_batch = self._embedding_batcher()
+        # Zero-filled so failed batches already hold the fallback vectors
+        embeddings = np.zeros((len(texts), settings.embedding_dimensions), dtype=np.float32)
+        
+        async def run_batch(start: int) -> None:
+            end = min(start + batch_size, len(texts))
+            async with self._async_semaphore:
+                try:
+                    # boto3 is blocking; the dedicated pool matches the semaphore size
+                    embeddings[start:end] = await loop.run_in_executor(
+                        self._async_executor, embed_batch, texts[start:end]
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to generate embeddings for chunks {start}-{end - 1}: {e}")
+        
+        await asyncio.gather(*[run_batch(start) for start in range(0, len(texts), batch_size)])
+        return embeddings
+    
     def generate_simple_text(self, prompt: str) -> str:
         """
         Generate a simple text response without context or grounding.
         Perfect for utility tasks like auto-naming sessions.
         """
         try:
-            request_body = json.dumps({
+            request_body = orjson.dumps({
                 "anthropic_version": "bedrock-2023-05-31",
                 "max_tokens": 100,
                 "temperature": 0.5,
@@ -121,21 +367,21 @@ class BedrockClient:
                 accept='application/json'
             )
             
-            response_body = json.loads(response['body'].read())
+            response_body = orjson.loads(response['body'].read())
             return response_body.get('content', [{}])[0].get('text', '').strip()
         except Exception as e:
             logger.error(f"Error in simple text generation: {e}")
             return ""
 
-    def generate_response(
+    def _build_response_request(
         self,
         user_message: str,
         context: str,
         conversation_history: List[Dict[str, str]] = None,
         use_knowledge_base: bool = True
-    ) -> str:
+    ) -> bytes:
         """
-        Generate a response using Claude with strict grounding.
+        Build the Claude request body for a grounded chat response.
         
         Args:
             user_message: Current user message
@@ -144,116 +390,144 @@ class BedrockClient:
             use_knowledge_base: Whether knowledge base access is enabled
             
         Returns:
-            Generated response text
+            Encoded JSON request body
         """
-        try:
-            # Build conversation with strict grounding system prompt
-            if use_knowledge_base:
-                system_prompt = """You are a helpful, professional assistant that uses a knowledge base to answer questions.
-
-GROUNDING RULES:
-1. For factual questions, use ONLY the provided "Context from knowledge base".
-2. PRIORITIZE the current "Context from knowledge base" even if it contradicts your previous answers in the conversation history. The knowledge base context can change or be updated between turns.
-3. If the answer is in the current context, provide it fully, even if you previously said it wasn't available. Address EVERY part of a multi-point question.
-4. If the answer for a specific part is missing, answer the other parts and state clearly which part is unavailable in the knowledge base.
-5. If the entire answer is missing, say: "I don't have enough information in my knowledge base to answer that question."
-6. DO NOT hallucinate. Be direct and concise.
-7. You may use information from the "Conversation History" to answer questions about the session context (e.g., user's name or what was previously discussed), but strictly rely on the "Context from knowledge base" for technical answers.
-7. For casual chat or greetings, ignore the knowledge base and answer naturally. """
-            else:
-                system_prompt = """You are a helpful assistant. Knowledge base access is currently DISABLED.
+        # Static system prompt first so it stays a byte-stable, cacheable prefix
+        system_prompt = _KB_SYSTEM_PROMPT if use_knowledge_base else _NO_KB_SYSTEM_PROMPT
 
-RULES:
-1. For greetings or casual chat, answer naturally.
-2. For factual questions, politely state: "Please enable the Knowledge Base in the UI to ask questions about the documents."
-3. DO NOT use internal knowledge for factual questions when access is disabled."""
-
-            # Format messages for Claude with alternating roles strictly enforced
-            formatted_messages = []
-            
-            if conversation_history:
-                last_role = None
-                for msg in conversation_history:
-                    role = msg["role"]
-                    content = msg["content"]
-                    
-                    if not content or not content.strip():
-                        continue
-                    
-                    # Anti-Bias Filter: If assistant said "I don't know", don't include it in history.
-                    # This prevents the AI from being biased by its own previous retrieval failures.
-                    if role == 'assistant':
-                        failure_phrases = [
-                            "don't have enough information", 
-                            "not in my knowledge base",
-                            "enable the knowledge base",
-                            "unavailable in the knowledge base"
-                        ]
-                        if any(phrase in content.lower() for phrase in failure_phrases):
-                            logger.info("Filtered failure response from history to avoid grounding bias")
-                            continue
-                        
-                    # Claude requires the first message in the array to be 'user'
-                    if not formatted_messages and role == 'assistant':
-                        logger.debug("Skipping leading assistant message in history to satisfy Bedrock validation")
-                        continue
-                        
-                    if role == last_role:
-                        # Merge content with previous message of same role
-                        formatted_messages[-1]["content"] += f"\n\n{content}"
-                        continue
-                    
-                    formatted_messages.append({
-                        "role": role,
-                        "content": content
-                    })
-                    last_role = role
-            
-            # Prepare current user content
-            if use_knowledge_base:
-                user_content = f"""Context from knowledge base:
+        # Only the most recent turns reach the prompt, so bound the work to them
+        # (a window of 0 must send none, not slice with [-0:] and send everything)
+        history = conversation_history or []
+        max_messages = settings.max_memory_messages * 2
+        history = history[max(0, len(history) - max_messages):] if max_messages > 0 else []
+        
+        # Anti-Bias Filter: If assistant said "I don't know", don't include it in history.
+        # This prevents the AI from being biased by its own previous retrieval failures.
+        kept = [
+            msg for msg in history
+            if msg["content"] and msg["content"].strip()
+            and not (msg["role"] == 'assistant' and _FAILURE_RE.search(msg["content"]))
+        ]
+        if len(kept) < len(history):
+            logger.info(f"Filtered {len(history) - len(kept)} empty or failure messages from history to avoid grounding bias")
+        
+        # Claude requires the first message in the array to be 'user'
+        kept = list(dropwhile(lambda msg: msg["role"] == 'assistant', kept))
+        
+        # Format messages for Claude with alternating roles strictly enforced,
+        # merging runs of same-role messages into one
+        formatted_messages = [
+            {"role": role, "content": "\n\n".join(msg["content"] for msg in run)}
+            for role, run in groupby(kept, key=itemgetter("role"))
+        ]
+        
+        # Prepare current user content
+        if use_knowledge_base:
+            user_content = f"""Context from knowledge base:
 {context if context else "None"}
 
 User question: {user_message}"""
+        else:
+            user_content = user_message
+        
+        # Prompt layout: [static system] -> [history] -> [dynamic context + question]
+        # so everything before the current question can be served from the prompt cache
+        system = system_prompt
+        if settings.prompt_caching_enabled:
+            system = [{"type": "text", "text": system_prompt, "cache_control": _CACHE_CONTROL}]
+            if formatted_messages:
+                formatted_messages[-1]["content"] = [
+                    {"type": "text", "text": formatted_messages[-1]["content"], "cache_control": _CACHE_CONTROL}
+                ]
+        
+        # Check if we should append or merge with last history message
+        if formatted_messages and formatted_messages[-1]["role"] == "user":
+            next_question = f"--- Next Question ---\n{user_content}"
+            if isinstance(formatted_messages[-1]["content"], list):
+                # Keep the cached history block intact and add the question after it
+                formatted_messages[-1]["content"].append({"type": "text", "text": next_question})
             else:
-                user_content = user_message
-            
-            # Check if we should append or merge with last history message
-            if formatted_messages and formatted_messages[-1]["role"] == "user":
-                formatted_messages[-1]["content"] += f"\n\n--- Next Question ---\n{user_content}"
-            else:
-                formatted_messages.append({
-                    "role": "user",
-                    "content": user_content
-                })
-            
-            # Claude 3 request format
-            request_body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 2000,
-                "temperature": 0.1,  # Low temperature for more factual responses
-                "system": system_prompt,
-                "messages": formatted_messages
+                formatted_messages[-1]["content"] += f"\n\n{next_question}"
+        else:
+            formatted_messages.append({
+                "role": "user",
+                "content": user_content
             })
+        
+        # Claude 3 request format
+        return orjson.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 2000,
+            "temperature": 0.1,  # Low temperature for more factual responses
+            "system": system,
+            "messages": formatted_messages
+        })
+
+    def generate_response_stream(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: List[Dict[str, str]] = None,
+        use_knowledge_base: bool = True
+    ) -> Iterator[str]:
+        """
+        Stream a response from Claude with strict grounding, as text deltas arrive.
+        
+        Args:
+            user_message: Current user message
+            context: Retrieved context from RAG
+            conversation_history: Previous messages (last 5)
+            use_knowledge_base: Whether knowledge base access is enabled
             
-            response = self.client.invoke_model(
+        Yields:
+            Chunks of generated response text
+        """
+        try:
+            request_body = self._build_response_request(
+                user_message, context, conversation_history, use_knowledge_base
+            )
+            
+            response = self.client.invoke_model_with_response_stream(
                 modelId=self.model_id,
                 body=request_body,
                 contentType='application/json',
                 accept='application/json'
             )
             
-            response_body = json.loads(response['body'].read())
-            
-            # Extract text from Claude response
-            assistant_message = response_body.get('content', [{}])[0].get('text', '')
-            
-            return assistant_message
+            for event in response['body']:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                payload = orjson.loads(chunk['bytes'])
+                if payload.get('type') == 'content_block_delta':
+                    yield payload['delta'].get('text', '')
             
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
 
+    def generate_response(
+        self,
+        user_message: str,
+        context: str,
+        conversation_history: List[Dict[str, str]] = None,
+        use_knowledge_base: bool = True
+    ) -> str:
+        """
+        Generate a response using Claude with strict grounding.
+        
+        Args:
+            user_message: Current user message
+            context: Retrieved context from RAG
+            conversation_history: Previous messages (last 5)
+            use_knowledge_base: Whether knowledge base access is enabled
+            
+        Returns:
+            Generated response text
+        """
+        return ''.join(self.generate_response_stream(
+            user_message, context, conversation_history, use_knowledge_base
+        ))
 
 # Global Bedrock client instance
 bedrock_client = BedrockClient()
@@ -1,8 +1,11 @@
 """Document processing with incremental ingestion support."""
+import multiprocessing
 import os
-import hashlib
-from pathlib import Path
-from typing import List, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, List, Dict, Tuple, Iterator
+from blake3 import blake3
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
     PyPDFLoader,
@@ -16,6 +19,220 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Merged chunks may exceed chunk_size by this factor before they are re-split
+_MERGE_CAP_FACTOR = 1.15
+
+# Recorded with each file hash; rows hashed with anything else count as changed
+HASH_ALGORITHM = 'blake3'
+
+# Supported file extensions
+_SUPPORTED_EXTENSIONS = frozenset({'.pdf', '.txt', '.md', '.docx'})
+
+
+def make_chunk_id(text: str) -> str:
+    """
+    Derive the vector store ID of a chunk from its content.
+    
+    Identical text gets the same ID wherever it occurs, which lets ingestion
+    skip chunks that are already embedded.
+    
+    Args:
+        text: Chunk text
+        
+    Returns:
+        Hex digest of the chunk's blake3 hash
+    """
+    return blake3(text.encode('utf-8')).hexdigest()
+
+
+class NativeTextSplitter:
+    """
+    Rust-backed splitter from semantic-text-splitter behind the LangChain splitter interface.
+    
+    Each document is split on its own, so chunks keep the page metadata of
+    the loader document they came from.
+    """
+    
+    def __init__(self, chunk_size: int, chunk_overlap: int):
+        from semantic_text_splitter import TextSplitter
+        self._splitter = TextSplitter(chunk_size, overlap=chunk_overlap)
+    
+    def split_text(self, text: str) -> List[str]:
+        """Split raw text into chunks."""
+        return self._splitter.chunks(text)
+    
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Split documents into chunk documents carrying their source metadata."""
+        return [
+            Document(page_content=chunk, metadata=dict(document.metadata))
+            for document in documents
+            for chunk in self._splitter.chunks(document.page_content)
+        ]
+
+
+@lru_cache(maxsize=8)
+def _build_splitter(chunk_size: int, chunk_overlap: int):
+    """Build a text splitter, reused for every file with the same settings in a process."""
+    if settings.text_splitter_backend == "native":
+        try:
+            return NativeTextSplitter(chunk_size, chunk_overlap)
+        except ImportError:
+            logger.warning("semantic-text-splitter not installed, falling back to RecursiveCharacterTextSplitter")
+    
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+def _merge_small_chunks(chunks: List[Document], splitter, chunk_size: int, min_chunk_size: int) -> List[Document]:
+    """
+    Merge context-poor slivers into a neighbour and re-split oversized chunks.
+    
+    A chunk shorter than min_chunk_size is joined to the previous chunk (or
+    the previous one to it) while the result stays within
+    _MERGE_CAP_FACTOR * chunk_size; merged chunks keep the lowest page number.
+    
+    Args:
+        chunks: Chunks produced by the splitter, in document order
+        splitter: Splitter used to re-split chunks over the cap
+        chunk_size: Target characters per chunk
+        min_chunk_size: Chunks shorter than this are merged
+        
+    Returns:
+        List of merged chunks
+    """
+    cap = int(chunk_size * _MERGE_CAP_FACTOR)
+    merged = []
+    
+    for chunk in chunks:
+        if merged:
+            previous = merged[-1]
+            is_small = len(chunk.page_content) < min_chunk_size or len(previous.page_content) < min_chunk_size
+            if is_small and len(previous.page_content) + len(chunk.page_content) + 1 <= cap:
+                previous.page_content = f"{previous.page_content}\n{chunk.page_content}"
+                previous.metadata['page'] = min(previous.metadata.get('page', 0), chunk.metadata.get('page', 0))
+                continue
+        merged.append(Document(page_content=chunk.page_content, metadata=dict(chunk.metadata)))
+    
+    result = []
+    for chunk in merged:
+        if len(chunk.page_content) <= cap:
+            result.append(chunk)
+            continue
+        result.extend(
+            Document(page_content=text, metadata=dict(chunk.metadata))
+            for text in splitter.split_text(chunk.page_content)
+        )
+    
+    return result
+
+
+def _iter_files(root: str, extensions: frozenset = _SUPPORTED_EXTENSIONS) -> Iterator[Tuple[str, str, os.stat_result]]:
+    """
+    Walk a directory tree once, yielding supported files.
+    
+    Args:
+        root: Directory to walk recursively
+        extensions: Lowercase extensions (with dot) to include
+        
+    Yields:
+        Tuples of (path, filename, stat) for each matching file
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                    yield entry.path, entry.name, entry.stat()
+
+
+def _load_document(file_path: str) -> List:
+    """
+    Load a document based on file extension.
+    
+    Args:
+        file_path: Path to document
+        
+    Returns:
+        List of LangChain Document objects
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    
+    try:
+        if ext == '.pdf':
+            loader = PyPDFLoader(file_path)
+        elif ext == '.txt':
+            loader = TextLoader(file_path, encoding='utf-8')
+        elif ext == '.md':
+            loader = UnstructuredMarkdownLoader(file_path)
+        elif ext == '.docx':
+            loader = Docx2txtLoader(file_path)
+        else:
+            logger.warning(f"Unsupported file type: {ext}")
+            return []
+        
+        documents = loader.load()
+        logger.info(f"Loaded {len(documents)} pages from {os.path.basename(file_path)}")
+        return documents
+        
+    except Exception as e:
+        logger.error(f"Error loading {file_path}: {str(e)}")
+        return []
+
+
+def _process_one(file_path: str, chunk_size: int, chunk_overlap: int) -> Tuple[str, List[str], List[Dict]]:
+    """
+    Load and split a single file.
+    
+    Module-level so it can be pickled and run in a worker process.
+    
+    Args:
+        file_path: Path to document
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared between consecutive chunks
+        
+    Returns:
+        Tuple of (filename, chunk_texts, chunk_metadatas)
+    """
+    filename = os.path.basename(file_path)
+    
+    # Load document
+    documents = _load_document(file_path)
+    if not documents:
+        return filename, [], []
+    
+    # Split into chunks, then fold tiny fragments into their neighbours
+    splitter = _build_splitter(chunk_size, chunk_overlap)
+    chunks = splitter.split_documents(documents)
+    if settings.min_chunk_size:
+        chunks = _merge_small_chunks(chunks, splitter, chunk_size, settings.min_chunk_size)
+    
+    texts = []
+    metadatas = []
+    
+    # Prepare metadata for each chunk
+    for i, chunk in enumerate(chunks):
+        # Extract page number if available
+        page_num = chunk.metadata.get('page', 0)
+        
+        texts.append(chunk.page_content)
+        metadatas.append({
+            'filename': filename,
+            'file_path': file_path,
+            'chunk_index': i,
+            'page': page_num,
+            'source': file_path,
+            # Hashed here, in the worker, so dedupe downstream costs no main-process CPU
+            'content_hash': make_chunk_id(chunk.page_content)
+        })
+    
+    return filename, texts, metadatas
+
 
 class DocumentProcessor:
     """Process documents with incremental ingestion."""
@@ -23,16 +240,11 @@ class DocumentProcessor:
     def __init__(self):
         """Initialize document processor."""
         # Use RecursiveCharacterTextSplitter for better chunking
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.chunk_size,
-            chunk_overlap=settings.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        self.text_splitter = _build_splitter(settings.chunk_size, settings.chunk_overlap)
     
     def calculate_file_hash(self, file_path: str) -> str:
         """
-        Calculate SHA-256 hash of a file.
+        Calculate the BLAKE3 hash of a file for change detection.
         
         Args:
             file_path: Path to file
@@ -40,12 +252,10 @@ class DocumentProcessor:
         Returns:
             Hex digest of file hash
         """
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            # Read file in chunks to handle large files
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+        # Memory-mapped and tree-hashed across cores inside the Rust binding
+        hasher = blake3(max_threads=blake3.AUTO)
+        hasher.update_mmap(file_path)
+        return hasher.hexdigest()
     
     def get_files_to_process(self) -> Tuple[List[str], List[str]]:
         """
@@ -54,35 +264,51 @@ class DocumentProcessor:
         Returns:
             Tuple of (files_to_process, skipped_files)
         """
-        data_path = settings.get_absolute_path(settings.data_folder)
+        data_path = settings.data_folder_abs
         
         if not os.path.exists(data_path):
             logger.warning(f"Data folder not found: {data_path}")
             return [], []
         
-        # Supported file extensions
-        supported_extensions = {'.pdf', '.txt', '.md', '.docx'}
-        
-        all_files = []
-        for ext in supported_extensions:
-            all_files.extend(Path(data_path).rglob(f'*{ext}'))
-        
         files_to_process = []
         skipped_files = []
+        to_hash = []
         
-        for file_path in all_files:
-            file_path_str = str(file_path)
-            filename = file_path.name
-            
-            # Calculate current file hash
-            current_hash = self.calculate_file_hash(file_path_str)
-            
+        # One scandir walk for every extension; the stat comes from the directory entry
+        for file_path_str, filename, stat in _iter_files(data_path):
             # Check if file already ingested
             existing_doc = session_db.get_document_by_filename(filename)
             
-            if existing_doc:
-                # Check if file has been modified
-                if existing_doc.file_hash == current_hash:
+            if not existing_doc:
+                # New file, process
+                files_to_process.append(file_path_str)
+                logger.info(f"New file found: {filename}")
+                continue
+            
+            # Same size and mtime as when ingested: unchanged without reading the file
+            if existing_doc.size == stat.st_size and existing_doc.mtime_ns == stat.st_mtime_ns:
+                skipped_files.append(filename)
+                logger.info(f"Skipping unchanged file: {filename}")
+                continue
+            
+            if existing_doc.hash_algorithm != HASH_ALGORITHM:
+                # Stored hash was made with another algorithm and cannot be compared
+                files_to_process.append(file_path_str)
+                logger.info(f"File hashed with an older algorithm, will reprocess: {filename}")
+                continue
+            
+            # Stat differs (or was never recorded): hash to tell a touch from a modification
+            to_hash.append((file_path_str, existing_doc))
+        
+        if to_hash:
+            # Hashing is disk-bound and releases the GIL, so threads overlap the reads
+            paths = [file_path_str for file_path_str, _ in to_hash]
+            with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+                hashes = dict(zip(paths, executor.map(self.calculate_file_hash, paths)))
+            
+            for file_path_str, existing_doc in to_hash:
+                filename = existing_doc.filename
+                if existing_doc.file_hash == hashes[file_path_str]:
                     # File unchanged, skip
                     skipped_files.append(filename)
                     logger.info(f"Skipping unchanged file: {filename}")
@@ -90,10 +316,6 @@ class DocumentProcessor:
                     # File modified, reprocess
                     files_to_process.append(file_path_str)
                     logger.info(f"File modified, will reprocess: {filename}")
-            else:
-                # New file, process
-                files_to_process.append(file_path_str)
-                logger.info(f"New file found: {filename}")
         
         return files_to_process, skipped_files
     
@@ -107,117 +329,113 @@ class DocumentProcessor:
         Returns:
             List of LangChain Document objects
         """
-        ext = Path(file_path).suffix.lower()
-        
-        try:
-            if ext == '.pdf':
-                loader = PyPDFLoader(file_path)
-            elif ext == '.txt':
-                loader = TextLoader(file_path, encoding='utf-8')
-            elif ext == '.md':
-                loader = UnstructuredMarkdownLoader(file_path)
-            elif ext == '.docx':
-                loader = Docx2txtLoader(file_path)
-            else:
-                logger.warning(f"Unsupported file type: {ext}")
-                return []
-            
-            documents = loader.load()
-            logger.info(f"Loaded {len(documents)} pages from {Path(file_path).name}")
-            return documents
-            
-        except Exception as e:
-            logger.error(f"Error loading {file_path}: {str(e)}")
-            return []
+        return _load_document(file_path)
     
-    def process_documents(self, file_paths: List[str], chunk_size: int = None, chunk_overlap: int = None) -> Dict:
+    def stream_chunks(
+        self,
+        file_paths: List[str],
+        shard_size: int = None,
+        chunk_size: int = None,
+        chunk_overlap: int = None
+    ) -> Iterator[Dict]:
         """
-        Process documents: load, chunk, and prepare for embedding.
+        Process documents and yield their chunks in shards.
+        
+        Files are parsed in a process pool, since PDF and DOCX loaders are pure
+        Python and hold the GIL. They are submitted in windows of
+        `ingest_process_workers` and their chunks buffered until the shard
+        holds at least `shard_size` chunks, so memory stays bounded by one
+        shard regardless of corpus size. Chunks whose content was already
+        yielded (repeated headers, footers, license blocks) are dropped.
         
         Args:
             file_paths: List of file paths to process
+            shard_size: Minimum number of chunks per yielded shard
             chunk_size: Optional chunk size override
             chunk_overlap: Optional chunk overlap override
             
-        Returns:
-            Dictionary with processed chunks and metadata
+        Yields:
+            Dictionaries with 'chunks', 'metadatas' and 'file_chunk_counts' (keyed by filename)
         """
         from tqdm import tqdm
         
-        # Use provided values or defaults from settings
-        c_size = chunk_size or settings.chunk_size
-        c_overlap = chunk_overlap or settings.chunk_overlap
-        
-        # Create a temporary splitter if overrides are provided
-        if chunk_size or chunk_overlap:
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=c_size,
-                chunk_overlap=c_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
-            )
-        else:
-            splitter = self.text_splitter
+        shard_size = shard_size or settings.ingest_shard_size
+        chunk_size = chunk_size or settings.chunk_size
+        chunk_overlap = chunk_overlap or settings.chunk_overlap
+        window = settings.ingest_process_workers
         
-        all_chunks = []
-        all_metadatas = []
-        file_chunk_counts = {}
+        shard = {'chunks': [], 'metadatas': [], 'file_chunk_counts': {}}
+        seen_hashes = set()
+        duplicates = 0
         
-        print(f"Starting processing of {len(file_paths)} files...")
+        logger.info(f"Starting processing of {len(file_paths)} files...")
         
-        for file_path in tqdm(file_paths, desc="Processing Files", unit="file"):
-            filename = Path(file_path).name
-            
-            # Load document
-            documents = self.load_document(file_path)
-            if not documents:
-                continue
-            
-            # Split into chunks
-            chunks = splitter.split_documents(documents)
-            
-            # Prepare metadata for each chunk
-            for i, chunk in enumerate(chunks):
-                # Extract page number if available
-                page_num = chunk.metadata.get('page', 0)
-                
-                chunk_metadata = {
-                    'filename': filename,
-                    'file_path': file_path,
-                    'chunk_index': i,
-                    'page': page_num,
-                    'source': file_path
-                }
+        # Files are independent, so load and split them in parallel worker processes.
+        # Spawn rather than fork: the server's threads may hold locks a forked child would inherit
+        with ProcessPoolExecutor(max_workers=window, mp_context=multiprocessing.get_context("spawn")) as executor, \
+                tqdm(total=len(file_paths), desc="Processing Files", unit="file") as pbar:
+            for start in range(0, len(file_paths), window):
+                futures = [
+                    executor.submit(_process_one, file_path, chunk_size, chunk_overlap)
+                    for file_path in file_paths[start:start + window]
+                ]
                 
-                all_chunks.append(chunk.page_content)
-                all_metadatas.append(chunk_metadata)
-            
-            file_chunk_counts[filename] = len(chunks)
-            logger.info(f"Processed {filename}: {len(chunks)} chunks")
+                # Collect in submission order so chunk ordering stays deterministic
+                for future in futures:
+                    pbar.update(1)
+                    try:
+                        filename, chunks, metadatas = future.result(timeout=settings.ingest_chunk_timeout)
+                    except Exception as e:
+                        logger.error(f"Error processing file: {str(e)}")
+                        continue
+                    
+                    if not chunks:
+                        continue
+                    
+                    for chunk, metadata in zip(chunks, metadatas):
+                        if metadata['content_hash'] in seen_hashes:
+                            duplicates += 1
+                            continue
+                        seen_hashes.add(metadata['content_hash'])
+                        shard['chunks'].append(chunk)
+                        shard['metadatas'].append(metadata)
+                    shard['file_chunk_counts'][filename] = len(chunks)
+                    logger.info(f"Processed {filename}: {len(chunks)} chunks")
+                    
+                    if len(shard['chunks']) >= shard_size:
+                        yield shard
+                        shard = {'chunks': [], 'metadatas': [], 'file_chunk_counts': {}}
         
-        return {
-            'chunks': all_chunks,
-            'metadatas': all_metadatas,
-            'file_chunk_counts': file_chunk_counts
-        }
+        if duplicates:
+            logger.info(f"Dropped {duplicates} duplicate chunks")
+        
+        if shard['chunks']:
+            yield shard
     
-    def update_document_metadata(self, file_path: str, chunk_count: int) -> None:
+    def build_document_metadata(self, file_path: str, chunk_count: int, job_id: str = None) -> Dict[str, Any]:
         """
-        Update document metadata in database.
+        Build a document metadata row for a processed file.
         
         Args:
             file_path: Path to file
             chunk_count: Number of chunks created
+            job_id: Optional ingestion job that processed the file
+            
+        Returns:
+            Row dict accepted by session_db.add_documents_bulk
         """
-        filename = Path(file_path).name
-        file_hash = self.calculate_file_hash(file_path)
-        
-        session_db.add_document_metadata(
-            filename=filename,
-            file_hash=file_hash,
-            file_path=file_path,
-            chunk_count=chunk_count
-        )
+        # Stat before hashing so a write during hashing shows up as a change next run
+        stat = os.stat(file_path)
+        return {
+            'filename': os.path.basename(file_path),
+            'file_hash': self.calculate_file_hash(file_path),
+            'hash_algorithm': HASH_ALGORITHM,
+            'file_path': file_path,
+            'chunk_count': chunk_count,
+            'job_id': job_id,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
 
 
 # Global document processor instance
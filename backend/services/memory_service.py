@@ -2,7 +2,9 @@
 from typing import Dict, List, Any, Optional
 from langgraph.store.memory import InMemoryStore
 from services.bedrock_client import bedrock_client
+from app.config import settings
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +13,18 @@ class MemoryService:
     
     def __init__(self):
         """Initialize semantic memory store."""
-        # Using 1536 dimensions for Amazon Titan Embeddings
+        # Dimensions must match the configured Bedrock embedding model
         self.store = InMemoryStore(
             index={
-                "embed": bedrock_client.generate_embeddings,
-                "dims": 1536
+                # The store expects plain lists, not the client's float32 arrays
+                "embed": lambda texts: bedrock_client.generate_embeddings(texts).tolist(),
+                "dims": settings.embedding_dimensions
             }
         )
+        # Sessions with at least one stored memory; searching any other
+        # session would embed the query for nothing
+        self._nonempty_sessions = set()
+        self._lock = threading.Lock()
         logger.info("Initialized semantic memory store with Bedrock embeddings")
 
     def put_memory(self, session_id: str, key: str, value: Dict[str, Any]) -> None:
@@ -31,6 +38,8 @@ class MemoryService:
         """
         namespace = (session_id, "context")
         self.store.put(namespace, key, value)
+        with self._lock:
+            self._nonempty_sessions.add(session_id)
         logger.info(f"Stored memory '{key}' for session {session_id}")
 
     def get_memories(self, session_id: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -44,10 +53,14 @@ class MemoryService:
         Returns:
             List of memory content dictionaries
         """
+        if session_id not in self._nonempty_sessions:
+            # Nothing stored: skip the search and its query embedding call
+            return []
+        
         namespace = (session_id, "context")
         
         if query:
-            # Semantic search for relevant memories
+            # Semantic search for relevant memories (query embeddings are cached by the Bedrock client)
             items = self.store.search(namespace, query=query, limit=5)
             return [item.value for item in items]
         else:
@@ -57,11 +70,33 @@ class MemoryService:
             return [item.value for item in items]
 
     def clear_session_memories(self, session_id: str) -> None:
-        """Clear all memories for a session - since it's InMemoryStore, this is handled by namespace."""
-        # Note: InMemoryStore doesn't have a direct 'delete_namespace', 
-        # but we can list and delete if needed. 
-        # For this implementation, we'll just let it be.
-        pass
+        """
+        Delete all memories stored for a session.
+        
+        Args:
+            session_id: The session ID
+        """
+        with self._lock:
+            if session_id not in self._nonempty_sessions:
+                return
+            self._nonempty_sessions.discard(session_id)
+        
+        # InMemoryStore has no namespace delete, so list the keys and delete each
+        namespace = (session_id, "context")
+        while True:
+            items = self.store.search(namespace, limit=100)
+            if not items:
+                break
+            for item in items:
+                self.store.delete(namespace, item.key)
+        logger.info(f"Cleared memories for session {session_id}")
+    
+    def clear_all_memories(self) -> None:
+        """Delete the memories of every session."""
+        with self._lock:
+            session_ids = list(self._nonempty_sessions)
+        for session_id in session_ids:
+            self.clear_session_memories(session_id)
 
 # Global memory service instance
 memory_service = MemoryService()
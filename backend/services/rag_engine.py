@@ -1,11 +1,15 @@
 """RAG engine for retrieval and answer generation."""
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
 from services.vector_store import vector_store
 from services.bedrock_client import bedrock_client
 from services.memory_service import memory_service
-from services.retriever import get_retriever
+from services.retriever import get_retriever, CrossEncoderRetriever
 from app.config import settings
+from cachetools import LRUCache
+import asyncio
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -13,21 +17,80 @@ logger = logging.getLogger(__name__)
 class RAGEngine:
     """RAG retrieval and generation engine."""
     
+    def __init__(self):
+        """Initialize the retrieval result cache."""
+        # Retrieval results keyed by (normalized query, top_k, use_reranking)
+        self._retrieval_cache = LRUCache(maxsize=settings.retrieval_cache_size)
+        self._retrieval_cache_lock = threading.Lock()
+    
+    def clear_retrieval_cache(self) -> None:
+        """Drop cached retrieval results, e.g. after the knowledge base changed."""
+        with self._retrieval_cache_lock:
+            self._retrieval_cache.clear()
+        logger.info("Cleared retrieval cache")
+    
+    async def warmup(self) -> None:
+        """Load expensive clients and models before the first request, concurrently."""
+        results = await asyncio.gather(
+            asyncio.to_thread(self._warm_embeddings),
+            asyncio.to_thread(self._warm_reranker),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                # A failed warmup only means the first request pays the cost
+                logger.warning(f"Warmup step failed: {result}")
+    
+    def _warm_embeddings(self) -> None:
+        """Issue a dummy embedding call to open the Bedrock connection."""
+        bedrock_client.generate_embedding("warmup")
+        logger.info("Warmed up Bedrock embeddings")
+    
+    def _warm_reranker(self) -> None:
+        """Load the Cross-Encoder and score one pair if reranking is enabled by default."""
+        if not settings.cross_encoder_enabled:
+            return
+        CrossEncoderRetriever(vector_store).warmup()
+    
     def retrieve(self, query: str, top_k: int = None, use_reranking: bool = None) -> Tuple[str, List[str], Any]:
         """
-        Retrieve relevant context for a query.
+        Retrieve relevant context for a query, reusing cached results for repeated queries.
         
         Args:
             query: User query
             top_k: Number of results to retrieve
+            use_reranking: Optional override of the Cross-Encoder setting
             
         Returns:
-            Tuple of (formatted_context, source_list)
+            Tuple of (formatted_context, source_list, rerank_summary)
         """
         if top_k is None:
             # We use 15 chunks to ensure coverage for multi-topic questions.
             top_k = max(settings.top_k_results, 15)
+        if use_reranking is None:
+            use_reranking = settings.cross_encoder_enabled
+        
+        cache_key = (query.strip().lower(), top_k, bool(use_reranking))
+        with self._retrieval_cache_lock:
+            cached = self._retrieval_cache.get(cache_key)
+        if cached is None:
+            cached = self._retrieve_uncached(query, top_k, use_reranking)
+            with self._retrieval_cache_lock:
+                self._retrieval_cache[cache_key] = cached
+        else:
+            logger.info("Retrieval cache hit")
+        
+        # Hand out fresh lists so callers cannot mutate the cached entry
+        context, sources, rerank_summary = cached
+        return context, list(sources), list(rerank_summary) if rerank_summary is not None else None
+    
+    def _retrieve_uncached(self, query: str, top_k: int, use_reranking: bool) -> Tuple[str, Tuple[str, ...], Any]:
+        """
+        Run vector search (and reranking if enabled) and format the context.
         
+        Returns:
+            Tuple of (formatted_context, sources, rerank_summary) with tuples in place of lists
+        """
         # Get retriever based on settings or override
         retriever = get_retriever(settings, vector_store, use_reranking=use_reranking)
         
@@ -36,11 +99,7 @@ class RAGEngine:
         
         if not results['documents']:
             logger.warning("No relevant documents found")
-            return "", [], None
-        
-        # Format context from retrieved chunks
-        context_parts = []
-        sources = []
+            return "", (), None
         
         # Handle ChromaDB structure which is sometimes nested
         docs = results['documents']
@@ -53,30 +112,27 @@ class RAGEngine:
 
         if not docs:
             logger.warning("No relevant documents found after unpacking")
-            return "", [], None
+            return "", (), None
 
-        for i, (doc, metadata) in enumerate(zip(docs, metas), 1):
-            filename = metadata.get('filename', 'Unknown')
-            page = metadata.get('page', 'N/A')
-            
-            # Format each chunk with source info
-            context_parts.append(
-                f"[Source {i}: {filename}, Page {page}]\n{doc}\n"
-            )
-            
-            # Track unique sources
-            source_ref = f"{filename} (Page {page})"
-            if source_ref not in sources:
-                sources.append(source_ref)
+        # Format each chunk with source info in one join, no intermediate list
+        formatted_context = "\n".join(
+            f"[Source {i}: {metadata.get('filename', 'Unknown')}, Page {metadata.get('page', 'N/A')}]\n{doc}\n"
+            for i, (doc, metadata) in enumerate(zip(docs, metas), 1)
+        )
         
-        logger.info(f"Retrieved {len(sources)} unique sources")
+        # Track unique sources, keeping first-seen order
+        sources = tuple(dict.fromkeys(
+            f"{metadata.get('filename', 'Unknown')} (Page {metadata.get('page', 'N/A')})"
+            for metadata in metas[:len(docs)]
+        ))
         
-        formatted_context = "\n".join(context_parts)
+        logger.info(f"Retrieved {len(sources)} unique sources")
         
         logger.info(f"Retrieved {len(results['documents'])} chunks from {len(sources)} sources")
         logger.debug(f"Retrieved Context Preview: {formatted_context[:500]}...")
         
-        return formatted_context, sources, results.get('rerank_summary')
+        rerank_summary = results.get('rerank_summary')
+        return formatted_context, sources, tuple(rerank_summary) if rerank_summary is not None else None
     
     def generate_answer(
         self,
@@ -84,7 +140,8 @@ class RAGEngine:
         context: str,
         session_id: str,
         conversation_history: List[Dict[str, str]] = None,
-        use_knowledge_base: bool = True
+        use_knowledge_base: bool = True,
+        memories: Optional[List[Dict[str, Any]]] = None
     ) -> str:
         """
         Generate an answer using RAG and semantic memory.
@@ -95,16 +152,19 @@ class RAGEngine:
             session_id: current session ID
             conversation_history: Previous messages (last 5)
             use_knowledge_base: Whether knowledge base is enabled
+            memories: Semantic memories already fetched for this query (fetched here if None)
             
         Returns:
             Generated answer
         """
-        # Retrieve semantic memories for this session
-        memories = memory_service.get_memories(session_id, query=query)
+        # Retrieve semantic memories for this session unless the caller prefetched them
+        if memories is None:
+            memories = memory_service.get_memories(session_id, query=query)
         memory_str = ""
         if memories:
             memory_list = []
-            for m in memories:
+            # Deterministic order keeps the injected context byte-stable across turns
+            for m in sorted(memories, key=lambda m: json.dumps(m, sort_keys=True, default=str)):
                 if isinstance(m, dict) and 'rules' in m:
                     memory_list.extend(m['rules'])
                 else:
@@ -127,7 +187,7 @@ class RAGEngine:
         
         return response
     
-    def chat(
+    async def chat(
         self,
         query: str,
         session_id: str,
@@ -138,24 +198,42 @@ class RAGEngine:
         """
         Complete RAG chat: retrieve context and generate answer.
         
+        The memory lookup and retrieval are independent, so they run
+        concurrently in worker threads before generation starts.
+        
         Args:
             query: User query
             session_id: Current session ID
             conversation_history: Previous messages
             use_knowledge_base: Whether to use the vector knowledge base
+            use_reranking: Optional override for Cross-Encoder reranking
             
         Returns:
             Tuple of (answer, sources, rerank_summary)
         """
-        # Step 1: Retrieve relevant context (only if enabled)
+        # Step 1: Fetch semantic memories and relevant context (only if enabled) concurrently
         context = ""
         sources = []
         rerank_summary = None
+        memories_task = asyncio.to_thread(memory_service.get_memories, session_id, query)
         if use_knowledge_base:
-            context, sources, rerank_summary = self.retrieve(query, use_reranking=use_reranking)
+            memories, (context, sources, rerank_summary) = await asyncio.gather(
+                memories_task,
+                asyncio.to_thread(self.retrieve, query, None, use_reranking)
+            )
+        else:
+            memories = await memories_task
         
         # Step 2: Generate answer
-        answer = self.generate_answer(query, context, session_id, conversation_history, use_knowledge_base)
+        answer = await asyncio.to_thread(
+            self.generate_answer,
+            query,
+            context,
+            session_id,
+            conversation_history,
+            use_knowledge_base,
+            memories
+        )
         
         return answer, sources, rerank_summary
 
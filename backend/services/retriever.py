@@ -3,13 +3,185 @@ Retriever abstractions for RAG.
 Implements Strategy pattern for retrieval mechanisms.
 """
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from functools import lru_cache
 from typing import List, Dict, Any, Tuple
 import logging
+import numpy as np
+import queue
+import threading
+import time
+from services.vector_store import KEEP_ALL_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
 # Global cache for the Cross-Encoder model to prevent repeated reloads
 _GLOBAL_MODEL_CACHE = {}
+# Serializes model loads so a request arriving mid-warmup waits instead of loading twice
+_MODEL_LOCK = threading.Lock()
+_WARMUP_STARTED = set()
+
+# One micro-batcher per Cross-Encoder model, shared by all requests
+_GLOBAL_BATCHERS = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def _score_pairs(model, pairs: List[List[str]], batch_size: int = 64, max_length: int = 256):
+    """
+    Score (query, document) pairs with a direct forward pass of the Cross-Encoder.
+    
+    Pairs are tokenized once, truncated to max_length and run under
+    inference mode, skipping the per-call overhead of CrossEncoder.predict.
+    
+    Args:
+        model: Loaded sentence-transformers CrossEncoder
+        pairs: List of [query, document] pairs
+        batch_size: Pairs per forward pass
+        max_length: Maximum tokens per pair
+        
+    Returns:
+        Array of relevance scores, one per pair
+    """
+    import torch
+    
+    # Same activation predict() would apply, so scores match the library's
+    activation = getattr(model, 'activation_fn', None) or getattr(model, 'default_activation_function', None)
+    device = model.model.device
+    scores = []
+    
+    with torch.inference_mode():
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            features = model.tokenizer(
+                [query for query, _ in batch],
+                [doc for _, doc in batch],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors='pt'
+            ).to(device)
+            logits = model.model(**features, return_dict=True).logits
+            if activation is not None:
+                logits = activation(logits)
+            scores.append(logits.squeeze(-1).float().cpu().numpy())
+    
+    return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+
+class OnnxCrossEncoder:
+    """
+    Cross-Encoder backed by an exported, int8-quantized ONNX Runtime session.
+    
+    Produced by export_onnx_reranker.py; returns the raw ranking logits,
+    which order documents the same way as the PyTorch model.
+    """
+    
+    def __init__(self, model_dir: str, file_name: str = "model_quantized.onnx"):
+        import os
+        import onnxruntime
+        from transformers import AutoTokenizer
+        
+        available = onnxruntime.get_available_providers()
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+        self.session = onnxruntime.InferenceSession(os.path.join(model_dir, file_name), providers=providers)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+    
+    def score_pairs(self, pairs: List[List[str]], batch_size: int = 64, max_length: int = 256):
+        """
+        Score (query, document) pairs with the ONNX session.
+        
+        Args:
+            pairs: List of [query, document] pairs
+            batch_size: Pairs per session run
+            max_length: Maximum tokens per pair
+            
+        Returns:
+            Array of relevance scores, one per pair
+        """
+        scores = []
+        for start in range(0, len(pairs), batch_size):
+            batch = pairs[start:start + batch_size]
+            features = self.tokenizer(
+                [query for query, _ in batch],
+                [doc for _, doc in batch],
+                padding=True,
+                truncation=True,
+                max_length=max_length,
+                return_tensors='np'
+            )
+            inputs = {name: value for name, value in features.items() if name in self.input_names}
+            logits = self.session.run(None, inputs)[0]
+            scores.append(logits[:, 0].astype(np.float32))
+        
+        return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+
+class CrossEncoderBatcher:
+    """
+    Coalesce concurrent Cross-Encoder scoring requests into one predict call.
+    
+    Requests arriving within max_wait_ms of each other (up to max_batch
+    requests) are concatenated, scored in a single forward pass and split
+    back per request, so concurrent chats share one model invocation.
+    """
+    
+    def __init__(self, model, max_batch: int = 32, max_wait_ms: float = 5.0, max_length: int = 256):
+        self.model = model
+        self.max_length = max_length
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="cross-encoder-batcher", daemon=True)
+        self._worker.start()
+    
+    def score(self, pairs: List[List[str]]):
+        """
+        Score (query, document) pairs, blocking until the batch containing them is done.
+        
+        Args:
+            pairs: List of [query, document] pairs
+            
+        Returns:
+            Array of relevance scores, one per pair
+        """
+        future = Future()
+        self._queue.put((pairs, future))
+        return future.result()
+    
+    def _run(self) -> None:
+        """Worker loop: gather a batch, score it, and resolve each request's future."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            all_pairs = [pair for pairs, _ in batch for pair in pairs]
+            try:
+                if isinstance(self.model, OnnxCrossEncoder):
+                    scores = self.model.score_pairs(all_pairs, max_length=self.max_length)
+                else:
+                    scores = _score_pairs(self.model, all_pairs, max_length=self.max_length)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            if len(batch) > 1:
+                logger.debug("Cross-Encoder scored %d requests (%d pairs) in one batch", len(batch), len(all_pairs))
+            
+            offset = 0
+            for pairs, future in batch:
+                future.set_result(scores[offset:offset + len(pairs)])
+                offset += len(pairs)
+
 
 class Retriever(ABC):
     """Abstract base class for retrievers."""
@@ -52,33 +224,95 @@ class CrossEncoderRetriever(Retriever):
     """
     
     def __init__(self, vector_store, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
-        from app.config import settings
         self.vector_store = vector_store
         self.model_name = model_name
-        self.stage1_k = settings.top_k_stage1 # Fetch candidates for reranking from settings
+    
+    @property
+    def stage1_k(self) -> int:
+        """Candidates fetched for reranking, read per query since the setting can change at runtime."""
+        from app.config import settings
+        return settings.top_k_stage1
         
     @property
     def model(self):
         """Lazy loader for the CrossEncoder model with global caching."""
         global _GLOBAL_MODEL_CACHE
+        if self.model_name in _GLOBAL_MODEL_CACHE:
+            return _GLOBAL_MODEL_CACHE[self.model_name]
+        with _MODEL_LOCK:
+            return self._load_model()
+    
+    def _load_model(self):
+        """Load the configured Cross-Encoder backend into the global cache (caller holds _MODEL_LOCK)."""
         if self.model_name not in _GLOBAL_MODEL_CACHE:
+            from app.config import settings
+            if settings.cross_encoder_backend == "onnx":
+                logger.info(f"Loading ONNX CrossEncoder from: {settings.cross_encoder_onnx_dir}")
+                try:
+                    _GLOBAL_MODEL_CACHE[self.model_name] = OnnxCrossEncoder(settings.cross_encoder_onnx_dir)
+                except Exception as e:
+                    logger.error(f"Failed to load ONNX CrossEncoder model: {e}")
+                    raise e
+                return _GLOBAL_MODEL_CACHE[self.model_name]
+            
             logger.info(f"Loading CrossEncoder model: {self.model_name}")
             try:
+                import torch
                 from sentence_transformers import CrossEncoder
-                _GLOBAL_MODEL_CACHE[self.model_name] = CrossEncoder(self.model_name)
+                model = CrossEncoder(self.model_name)
+                model.model.eval()
+                if torch.cuda.is_available():
+                    # FP16 halves memory traffic on the Stage-2 hot path
+                    torch.backends.cuda.matmul.allow_tf32 = True
+                    model.model.half()
+                _GLOBAL_MODEL_CACHE[self.model_name] = model
             except Exception as e:
                 logger.error(f"Failed to load CrossEncoder model: {e}")
                 raise e
         return _GLOBAL_MODEL_CACHE[self.model_name]
+    
+    @property
+    def batcher(self) -> CrossEncoderBatcher:
+        """Shared micro-batcher for this model, started on first use."""
+        from app.config import settings
+        with _BATCHERS_LOCK:
+            if self.model_name not in _GLOBAL_BATCHERS:
+                _GLOBAL_BATCHERS[self.model_name] = CrossEncoderBatcher(
+                    self.model,
+                    max_batch=settings.rerank_batch_max_size,
+                    max_wait_ms=settings.rerank_batch_max_wait_ms,
+                    max_length=settings.rerank_max_length
+                )
+            return _GLOBAL_BATCHERS[self.model_name]
+    
+    def warmup(self) -> None:
+        """Load the model and score a dummy pair so kernels and allocator caches are ready."""
+        self.batcher.score([["warmup", "warmup"]])
+        logger.info("Warmed up Cross-Encoder reranker")
+    
+    def warmup_in_background(self) -> None:
+        """Start warmup on a daemon thread once per model, if the model is not loaded yet."""
+        with _MODEL_LOCK:
+            if self.model_name in _GLOBAL_MODEL_CACHE or self.model_name in _WARMUP_STARTED:
+                return
+            _WARMUP_STARTED.add(self.model_name)
+        
+        def _warm():
+            try:
+                self.warmup()
+            except Exception as e:
+                logger.warning(f"Cross-Encoder warmup failed: {e}")
+        
+        threading.Thread(target=_warm, name="cross-encoder-warmup", daemon=True).start()
         
     def retrieve(self, query: str, top_k: int) -> Dict[str, Any]:
         """Retrieve candidates and rerank them with detailed audit logging."""
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Stage 1: Vector Search (Candidate Generation)
-        logger.info(f"🔍 [Rerank] Stage 1: Fetching {self.stage1_k} candidates from Vector Store")
-        candidates = self.vector_store.search(query, top_k=self.stage1_k, threshold=1000.0)
+        logger.info("[Rerank] Stage 1: Fetching %d candidates from Vector Store", self.stage1_k)
+        # The reranker decides relevance, so stage 1 keeps every candidate
+        candidates = self.vector_store.search(query, top_k=self.stage1_k, threshold=KEEP_ALL_THRESHOLD)
         
         if not candidates['documents']:
             return candidates
@@ -90,59 +324,56 @@ class CrossEncoderRetriever(Retriever):
             return {'documents': [], 'metadatas': []}
 
         # Stage 2: Reranking
-        logger.info(f"🧠 [Rerank] Stage 2: Passing {len(docs)} candidates to Cross-Encoder")
+        logger.info("[Rerank] Stage 2: Passing %d candidates to Cross-Encoder", len(docs))
         
         # Prepare pairs for scoring: (query, doc_text)
         pairs = [[query, doc_text] for doc_text in docs]
         
-        # Score pairs
-        scores = self.model.predict(pairs)
-        
-        # Pair up scores with content indices and initial rank
-        scored_results = []
-        for idx, score in enumerate(scores):
-            scored_results.append({
-                'score': float(score),
-                'doc': docs[idx],
-                'metadata': metadatas[idx],
-                'initial_rank': idx + 1
-            })
-            
-        # Sort by score descending
-        scored_results.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Log Summary
-        logger.info("📊 --- Reranking Impact Summary ---")
-        for i, res in enumerate(scored_results[:top_k]):
-            new_rank = i + 1
-            jump = res['initial_rank'] - new_rank
-            arrow = "↑" if jump > 0 else ("↓" if jump < 0 else "-")
-            jump_val = abs(jump) if jump != 0 else ""
-            
-            fname = res['metadata'].get('filename', 'Unknown')[:20]
-            logger.info(f"Final Rank {new_rank}: {fname}... [Score: {res['score']:.4f}] (Was Rank {res['initial_rank']} {arrow}{jump_val})")
+        # Score pairs, batched together with any concurrent requests
+        scores = self.batcher.score(pairs)
         
-        # Select final top_k
-        final_results = scored_results[:top_k]
+        # Select the top_k winners in native code: O(N) partition, then sort only the winners
+        scores = np.asarray(scores, dtype=np.float32)
+        k = min(top_k, len(scores))
+        order = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        order = order[np.argsort(-scores[order], kind='stable')]
+        
+        # Parallel arrays for the winners, unboxed to Python values in one call each
+        final_idx = order.tolist()
+        final_scores = scores[order].tolist()
+        initial_ranks = (order + 1).tolist()
+        final_metadatas = [metadatas[idx] for idx in final_idx]
+        
+        # Log Summary, only built when INFO records are actually emitted
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("--- Reranking Impact Summary ---")
+            for new_rank, (initial_rank, score, metadata) in enumerate(zip(initial_ranks, final_scores, final_metadatas), start=1):
+                jump = initial_rank - new_rank
+                arrow = "↑" if jump > 0 else ("↓" if jump < 0 else "-")
+                jump_val = abs(jump) if jump != 0 else ""
+                
+                logger.info(
+                    "Final Rank %d: %s... [Score: %.4f] (Was Rank %d %s%s)",
+                    new_rank, metadata.get('filename', 'Unknown')[:20], score, initial_rank, arrow, jump_val
+                )
         
         # Prepare structured summary for API response
         rerank_summary = [
             {
-                "initial_rank": r["initial_rank"],
-                "final_rank": i + 1,
-                "score": r["score"],
-                "filename": r["metadata"].get("filename", "Unknown"),
-                "page": str(r["metadata"].get("page", "N/A"))
+                "initial_rank": initial_rank,
+                "final_rank": new_rank,
+                "score": score,
+                "filename": metadata.get("filename", "Unknown"),
+                "page": str(metadata.get("page", "N/A"))
             }
-            for i, r in enumerate(final_results)
+            for new_rank, (initial_rank, score, metadata) in enumerate(zip(initial_ranks, final_scores, final_metadatas), start=1)
         ]
 
-        total_ms = (time.time() - start_time) * 1000
-        logger.info(f"✅ Reranking complete in {total_ms:.2f}ms")
+        logger.info("[Rerank] Reranking complete in %.2fms", (time.perf_counter() - start_time) * 1000)
         
         return {
-            'documents': [r['doc'] for r in final_results],
-            'metadatas': [r['metadata'] for r in final_results],
+            'documents': [docs[idx] for idx in final_idx],
+            'metadatas': final_metadatas,
             'rerank_summary': rerank_summary
         }
 
@@ -152,7 +383,17 @@ def get_retriever(settings, vector_store, use_reranking: bool = None) -> Retriev
     # Use override if provided, otherwise fallback to global setting
     is_enabled = use_reranking if use_reranking is not None else settings.cross_encoder_enabled
     
-    if is_enabled:
-        return CrossEncoderRetriever(vector_store)
+    return _build_retriever(vector_store, bool(is_enabled))
+
+
+@lru_cache(maxsize=4)
+def _build_retriever(vector_store, use_reranking: bool) -> Retriever:
+    """Build a retriever once per vector store and mode; retrievers hold no per-query state."""
+    if use_reranking:
+        retriever = CrossEncoderRetriever(vector_store)
+        # Per-request overrides can enable reranking when startup skipped the
+        # warmup; load the model alongside Stage 1 rather than after it
+        retriever.warmup_in_background()
+        return retriever
     else:
         return VectorRetriever(vector_store)
@@ -1,19 +1,56 @@
 """Session manager with simple rolling 5-message memory."""
-from typing import Dict, List, Optional
+from collections import deque
+from itertools import islice
+from types import MappingProxyType
+from typing import Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+from cachetools import LRUCache
 from database.session_db import session_db
+from services.bedrock_client import bedrock_client
+from services.memory_service import memory_service
 from app.config import settings
+from datetime import datetime
+import atexit
 import logging
+import queue
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Read-only history entry; shared with callers without defensive copies
+HistoryMessage = Mapping[str, str]
+
+# Session names that were never chosen by the user and may be replaced by a generated title
+_GENERIC_PREFIXES = ("Chat Session", "New Chat", "Session", "Conversation")
+_AUTONAME_PROMPT_TMPL = (
+    "Generate a very concise, 2-4 word title for a chat conversation that starts with this message: "
+    "'{}'. Respond ONLY with the title. No quotes, no intro, no punctuation."
+)
+# A title only needs the gist of the first message
+_AUTONAME_MAX_INPUT_CHARS = 500
+
 
 class SessionManager:
     """Manages chat sessions with rolling 5-message memory."""
     
     def __init__(self):
         """Initialize session manager."""
-        # Cache for conversation history per session
-        self._memory_cache: Dict[str,  List[Dict[str, str]]] = {}
+        # Cache for conversation history per session; each deque evicts its oldest message itself.
+        # Cold sessions are evicted and reloaded from the database on their next turn.
+        self._memory_cache: LRUCache = LRUCache(maxsize=settings.max_cached_sessions)
+        self._cache_lock = threading.Lock()
+        # Messages per memory window: 5 user + 5 assistant = 10 total
+        self._max_messages = settings.max_memory_messages * 2
+        # (monotonic time, session rows) for the sidebar list, dropped on any session change
+        self._sessions_list_cache: Optional[Tuple[float, Tuple[Dict, ...]]] = None
+        
+        # Message rows are persisted by one writer thread in batched transactions,
+        # so adding a message only updates the in-memory window on the caller's thread
+        self._write_queue: queue.Queue = queue.Queue(maxsize=settings.message_write_queue_size)
+        self._writer = threading.Thread(target=self._writer_loop, name="session-writer", daemon=True)
+        self._writer.start()
+        # The writer is a daemon thread; drain its queue before the interpreter exits
+        atexit.register(self.flush)
     
     def create_session(self, name: Optional[str] = None) -> str:
         """
@@ -26,7 +63,9 @@ class SessionManager:
             Session ID
         """
         session = session_db.create_session(name)
-        self._memory_cache[session.id] = []
+        with self._cache_lock:
+            self._memory_cache[session.id] = self._new_memory()
+        self._invalidate_sessions_list()
         
         logger.info(f"Created new session: {session.id}")
         return session.id
@@ -38,39 +77,114 @@ class SessionManager:
         Returns:
             List of session dictionaries
         """
-        sessions = session_db.get_all_sessions()
-        return [
-            {
-                "id": s.id,
-                "name": s.name,
-                "created_at": s.created_at,
-                "updated_at": s.updated_at
-            }
-            for s in sessions
-        ]
+        return self.get_all_sessions_as_dicts()
+    
+    def get_all_sessions_as_dicts(self) -> List[Dict]:
+        """
+        Get all chat sessions as dicts straight from the database row tuples.
+        
+        Polling bursts are served from a short-lived cache that every session
+        change invalidates.
+        
+        Returns:
+            List of session dictionaries
+        """
+        cached = self._sessions_list_cache
+        if cached is not None and time.monotonic() - cached[0] < settings.sessions_list_cache_ttl:
+            return list(cached[1])
+        
+        sessions = tuple(session_db.get_all_sessions_as_dicts())
+        self._sessions_list_cache = (time.monotonic(), sessions)
+        return list(sessions)
+    
+    def _enqueue_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        rerank_summary: list = None,
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """Queue a message row for the background writer (blocks only if the queue is full)."""
+        self._write_queue.put({
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "rerank_summary": rerank_summary,
+            # Stamp now, not when the batch is written, so ordering reflects arrival
+            "timestamp": timestamp or datetime.utcnow()
+        })
+    
+    def _writer_loop(self) -> None:
+        """Drain the write queue in batches and insert each batch in one transaction."""
+        batch_size = settings.message_write_batch_size
+        max_wait = settings.message_write_max_wait_ms / 1000.0
+        while True:
+            rows = [self._write_queue.get()]
+            deadline = time.monotonic() + max_wait
+            while len(rows) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_rows(rows)
+            finally:
+                for _ in rows:
+                    self._write_queue.task_done()
+    
+    def _write_rows(self, rows: List[Dict]) -> None:
+        """
+        Insert a batch of queued message rows, isolating rows that cannot be written.
+        
+        A failed batch is retried row by row, so one bad row (e.g. for a session
+        deleted after its message was queued) does not take the others with it.
+        
+        Args:
+            rows: Queued message rows
+        """
+        try:
+            session_db.add_messages_bulk(rows)
+        except Exception as e:
+            logger.warning(f"Batch write of {len(rows)} messages failed, retrying one by one: {e}")
+            for row in rows:
+                try:
+                    session_db.add_messages_bulk([row])
+                except Exception as row_error:
+                    logger.error(f"Dropped queued message for session {row['session_id']}: {row_error}")
+        self._invalidate_sessions_list()
+    
+    def flush(self) -> None:
+        """Block until every queued message has been written to the database."""
+        self._write_queue.join()
+    
+    def _invalidate_sessions_list(self) -> None:
+        """Drop the cached session list after a session was created, renamed, touched or deleted."""
+        self._sessions_list_cache = None
     
     def get_session_detail(self, session_id: str) -> Optional[Dict]:
         """
         Get session details with messages.
         """
-        import json
-        session = session_db.get_session_by_id(session_id)
+        # Session row and messages come back from a single JOIN query
+        self.flush()
+        session, messages = session_db.get_session_with_messages(session_id)
         if not session:
             return None
         
-        messages = session_db.get_session_messages(session_id)
-        
         return {
-            "id": session.id,
-            "name": session.name,
-            "created_at": session.created_at,
-            "updated_at": session.updated_at,
+            **session,
             "messages": [
                 {
                     "role": m.role,
                     "content": m.content,
                     "timestamp": m.timestamp,
-                    "rerank_summary": json.loads(m.rerank_summary) if m.rerank_summary else None
+                    # Decoded by the JSON column type
+                    "rerank_summary": m.rerank_summary
                 }
                 for m in messages
             ]
@@ -87,10 +201,15 @@ class SessionManager:
             True if deleted successfully
         """
         # Remove from memory cache
-        if session_id in self._memory_cache:
-            del self._memory_cache[session_id]
+        with self._cache_lock:
+            self._memory_cache.pop(session_id, None)
+        memory_service.clear_session_memories(session_id)
         
-        return session_db.delete_session(session_id)
+        # Queued rows for this session would otherwise be written after the delete
+        self.flush()
+        deleted = session_db.delete_session(session_id)
+        self._invalidate_sessions_list()
+        return deleted
     
     def delete_all_sessions(self) -> int:
         """
@@ -99,12 +218,19 @@ class SessionManager:
         Returns:
             Number of sessions deleted
         """
-        self._memory_cache.clear()
-        return session_db.delete_all_sessions()
+        with self._cache_lock:
+            self._memory_cache.clear()
+        memory_service.clear_all_memories()
+        self.flush()
+        count = session_db.delete_all_sessions()
+        self._invalidate_sessions_list()
+        return count
     
     def update_session(self, session_id: str, name: str) -> bool:
         """Update a session's name."""
-        return session_db.update_session_name(session_id, name)
+        updated = session_db.update_session_name(session_id, name)
+        self._invalidate_sessions_list()
+        return updated
 
     def auto_name_session(self, session_id: str, first_message: str) -> None:
         """
@@ -114,21 +240,12 @@ class SessionManager:
         # Get current session to check name
         session = session_db.get_session_by_id(session_id)
         
-        # Only auto-name if it has the default "Chat Session YYYY-MM-DD..." name
-        if not session or not session.name.startswith("Chat Session"):
-            return
-
-        from services.bedrock_client import bedrock_client
-        prompt = (
-            "Generate a very concise, 2-4 word title for a chat conversation that starts with this message: "
-            f"'{first_message}'. Respond ONLY with the title. No quotes, no intro, no punctuation."
-        )
-            
         # Only auto-name if it has a generic default name
-        generic_prefixes = ("Chat Session", "New Chat", "Session", "Conversation")
-        if not session or not session.name.startswith(generic_prefixes):
+        if not session or not session.name.startswith(_GENERIC_PREFIXES):
             logger.info(f"Skipping auto-naming for session {session_id} with custom name: {session.name if session else 'None'}")
             return
+        
+        prompt = _AUTONAME_PROMPT_TMPL.format(first_message[:_AUTONAME_MAX_INPUT_CHARS])
         try:
             new_name = bedrock_client.generate_simple_text(prompt)
             if new_name and len(new_name) < 50:
@@ -140,7 +257,22 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Failed to auto-name session: {e}")
 
-    def _get_or_create_memory(self, session_id: str) -> List[Dict[str, str]]:
+    def _new_memory(self, messages: Iterable = ()) -> Deque[HistoryMessage]:
+        """
+        Build a rolling memory window from stored messages.
+        
+        Args:
+            messages: Stored messages, oldest first
+            
+        Returns:
+            Deque of read-only message mappings bounded to the memory window
+        """
+        return deque(
+            (MappingProxyType({"role": m.role, "content": m.content}) for m in messages),
+            maxlen=self._max_messages
+        )
+    
+    def _get_or_create_memory(self, session_id: str) -> Optional[Deque[HistoryMessage]]:
         """
         Get or create memory for a session with 5-message window.
         
@@ -148,29 +280,87 @@ class SessionManager:
             session_id: Session ID
             
         Returns:
-            List of message dictionaries
+            Deque of read-only message mappings, or None if the session does not exist
         """
-        if session_id not in self._memory_cache:
-            # Load existing messages from database (last 5 only)
+        with self._cache_lock:
+            memory = self._memory_cache.get(session_id)
+        
+        if memory is None:
+            # Load existing messages from database (last 5 only), including queued ones
+            self.flush()
             messages = session_db.get_session_messages(
                 session_id,
-                limit=settings.max_memory_messages * 2  # 5 user + 5 assistant = 10 total
+                limit=self._max_messages,
+                include_rerank_summary=False
             )
+            # Never cache a window for a deleted session; late writes would recreate it
+            if not messages and not session_db.get_session_by_id(session_id):
+                return None
             
             # Convert to simple dict format
-            self._memory_cache[session_id] = [
-                {
-                    "role": m.role,
-                    "content": m.content
-                }
-                for m in messages
-            ]
+            memory = self._new_memory(messages)
+            with self._cache_lock:
+                self._memory_cache[session_id] = memory
             
             logger.info(f"Loaded memory for session {session_id} with {len(messages)} messages")
         
-        return self._memory_cache[session_id]
+        return memory
+    
+    def warm_recent(self, n: int = 100) -> int:
+        """
+        Preload the memory of the most recently active sessions.
+        
+        All histories come from a single query, so the first turn of a hot
+        session after a restart does not pay its own database round-trip.
+        
+        Args:
+            n: Number of sessions to preload, newest by updated_at first
+            
+        Returns:
+            Number of sessions added to the memory cache
+        """
+        n = min(n, settings.max_cached_sessions)
+        if n <= 0:
+            return 0
+        
+        self.flush()
+        recent = session_db.get_recent_sessions_messages(n)
+        
+        warmed = 0
+        with self._cache_lock:
+            # Insert the least recent session first so the LRU order matches activity
+            for session_id, messages in reversed(recent.items()):
+                if session_id in self._memory_cache:
+                    continue
+                # The bounded deque keeps only the last window of each history
+                self._memory_cache[session_id] = self._new_memory(messages)
+                warmed += 1
+        
+        logger.info(f"Warmed memory for {warmed} recent sessions")
+        return warmed
     
-    def get_conversation_history(self, session_id: str) -> List[Dict[str, str]]:
+    def resize_memory(self, max_memory_messages: int) -> None:
+        """
+        Apply a new memory window size to cached and future sessions.
+        
+        Args:
+            max_memory_messages: Conversation turns to remember per session
+        """
+        max_messages = max_memory_messages * 2
+        with self._cache_lock:
+            if max_messages == self._max_messages:
+                return
+            if max_messages > self._max_messages:
+                # Cached windows lack the older messages; reload them from the database on demand
+                self._memory_cache.clear()
+            else:
+                for session_id, memory in list(self._memory_cache.items()):
+                    self._memory_cache[session_id] = deque(memory, maxlen=max_messages)
+            self._max_messages = max_messages
+        
+        logger.info(f"Resized session memory to {max_messages} messages")
+    
+    def get_conversation_history(self, session_id: str) -> Tuple[HistoryMessage, ...]:
         """
         Get conversation history (last 5 messages).
         
@@ -178,60 +368,133 @@ class SessionManager:
             session_id: Session ID
             
         Returns:
-            List of message dictionaries with 'role' and 'content'
+            Tuple of read-only message mappings with 'role' and 'content'
         """
         memory = self._get_or_create_memory(session_id)
-        
+        return self._history(memory) if memory is not None else ()
+    
+    def _history(self, memory: Deque[HistoryMessage]) -> Tuple[HistoryMessage, ...]:
+        """Snapshot the current memory window of a session's deque."""
         # Return last 5 conversation turns (10 messages total)
-        max_messages = settings.max_memory_messages * 2
-        history_slice = memory[-max_messages:] if len(memory) > max_messages else memory
-        return [msg.copy() for msg in history_slice]  # Return a deep copy of the message dicts
+        start = max(0, len(memory) - self._max_messages)
+        # Entries are immutable proxies, so sharing them needs no copy
+        return tuple(islice(memory, start, None))
     
-    def add_user_message(self, session_id: str, message: str) -> None:
+    def begin_turn(
+        self,
+        session_id: str,
+        message: str,
+        timestamp: Optional[datetime] = None
+    ) -> Tuple[Optional[Dict], Tuple[HistoryMessage, ...]]:
         """
-        Add user message to session (maintains 5-message window).
+        Start a chat turn: load the session and its history and store the user message.
+        
+        Empty messages and exact repeats of the previous user message (double
+        submits) are not stored again.
         
         Args:
             session_id: Session ID
             message: User message content
+            timestamp: Optional message timestamp (defaults to now)
+            
+        Returns:
+            Tuple of (session dict or None if not found, conversation history before this message)
         """
-        # Add to database
-        session_db.add_message(session_id, "user", message)
-        
-        # Add to memory cache
         memory = self._get_or_create_memory(session_id)
-        memory.append({
-            "role": "user",
-            "content": message
-        })
+        if memory is None:
+            return None, ()
+        
+        history = self._history(memory)
+        redundant = self._is_redundant(memory, "user", message)
+        if redundant:
+            logger.info(f"Skipped empty or repeated user message for session {session_id}")
+            if history and history[-1]["role"] == "user" and history[-1]["content"] == message:
+                # Answer a double submit from the history before its first copy
+                history = history[:-1]
+        
+        session = session_db.begin_turn(session_id, message, timestamp=timestamp, store_message=not redundant)
+        if not session:
+            return None, ()
         
-        # Trim to last 5 conversation turns (10 messages)
-        max_messages = settings.max_memory_messages * 2
-        if len(memory) > max_messages:
-            self._memory_cache[session_id] = memory[-max_messages:]
+        if not redundant:
+            # The session's updated_at moved, which reorders the list
+            self._invalidate_sessions_list()
+            # Add to memory cache (the deque drops the oldest message past 10)
+            memory.append(MappingProxyType({
+                "role": "user",
+                "content": message
+            }))
+            logger.info(f"Added user message to session {session_id}")
         
-        logger.info(f"Added user message to session {session_id}")
+        session_info = {
+            "id": session.id,
+            "name": session.name,
+            "created_at": session.created_at,
+            "updated_at": session.updated_at
+        }
+        return session_info, history
     
-    def add_assistant_message(self, session_id: str, message: str, rerank_summary: list = None) -> None:
+    @staticmethod
+    def _is_redundant(memory: Deque[HistoryMessage], role: str, message: str) -> bool:
         """
-        Add assistant message to session with optional audit data.
+        Check whether a message would only pollute the memory window.
+        
+        Args:
+            memory: The session's current memory window
+            role: Role of the new message
+            message: Content of the new message
+            
+        Returns:
+            True for empty or whitespace-only messages and exact repeats of the previous message
         """
-        # Add to database
-        session_db.add_message(session_id, "assistant", message, rerank_summary=rerank_summary)
+        if not message or not message.strip():
+            return True
+        return bool(memory) and memory[-1]["role"] == role and memory[-1]["content"] == message
+    
+    def _append(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        rerank_summary: list = None,
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """
+        Append a message to the session's memory window and queue it for persistence.
         
-        # Add to memory cache
+        Args:
+            session_id: Session ID
+            role: 'user' or 'assistant'
+            content: Message content
+            rerank_summary: Optional audit data stored with the message
+            timestamp: Optional message timestamp (defaults to now)
+        """
         memory = self._get_or_create_memory(session_id)
-        memory.append({
-            "role": "assistant",
-            "content": message
-        })
+        if memory is None:
+            logger.info(f"Skipped {role} message for missing session {session_id}")
+            return
+        if self._is_redundant(memory, role, content):
+            logger.info(f"Skipped empty or repeated {role} message for session {session_id}")
+            return
         
-        # Trim to last 5 conversation turns (10 messages)
-        max_messages = settings.max_memory_messages * 2
-        if len(memory) > max_messages:
-            self._memory_cache[session_id] = memory[-max_messages:]
+        # The deque drops the oldest message past 10
+        memory.append(MappingProxyType({"role": role, "content": content}))
+        # Persist in the background
+        self._enqueue_message(session_id, role, content, rerank_summary=rerank_summary, timestamp=timestamp)
         
-        logger.info(f"Added assistant message to session {session_id}")
+        logger.info(f"Added {role} message to session {session_id}")
+    
+    def add_assistant_message(
+        self,
+        session_id: str,
+        message: str,
+        rerank_summary: list = None,
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """
+        Add assistant message to session with optional audit data and timestamp.
+        """
+        self._append(session_id, "assistant", message, rerank_summary=rerank_summary, timestamp=timestamp)
 
 
 # Global session manager instance
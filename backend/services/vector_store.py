@@ -1,20 +1,33 @@
 """ChromaDB vector store for document embeddings."""
 import chromadb
+import numpy as np
+import threading
+from cachetools import LRUCache
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from app.config import settings
 from services.bedrock_client import bedrock_client
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rows per collection.add call, kept under Chroma's SQLite max batch size (5461)
+_ADD_BATCH_SIZE = 5000
+
+# Search thresholds at or above this keep every match, so distance filtering is skipped
+KEEP_ALL_THRESHOLD = 1e9
+
 
 class CustomEmbeddingFunction:
     """Custom embedding function using AWS Bedrock Titan."""
     
-    def __call__(self, input: List[str]) -> List[List[float]]:
+    def __call__(self, input: List[str]) -> np.ndarray:
         """Generate embeddings for a list of texts using optimized batch client."""
-        return bedrock_client.generate_embeddings(input)
+        return self.embed_documents(input)
+    
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of document chunks in one client call."""
+        return bedrock_client.generate_embeddings(texts)
 
 
 class VectorStore:
@@ -22,7 +35,7 @@ class VectorStore:
     
     def __init__(self):
         """Initialize ChromaDB with persistent storage."""
-        chroma_path = settings.get_absolute_path(settings.chroma_db_path)
+        chroma_path = settings.chroma_db_path_abs
         
         self.client = chromadb.PersistentClient(
             path=chroma_path,
@@ -34,6 +47,10 @@ class VectorStore:
         
         self.embedding_function = CustomEmbeddingFunction()
         
+        # Query embeddings keyed by normalized query text
+        self._query_embedding_cache = LRUCache(maxsize=settings.query_embedding_cache_size)
+        self._query_embedding_lock = threading.Lock()
+        
         # Get or create collection - don't pass embedding function to avoid conflicts
         try:
             self.collection = self.client.get_collection(
@@ -51,7 +68,8 @@ class VectorStore:
         self,
         texts: List[str],
         metadatas: List[Dict[str, Any]],
-        ids: List[str]
+        ids: List[str],
+        embeddings: Optional[np.ndarray] = None
     ) -> None:
         """
         Add documents to the vector store.
@@ -60,17 +78,21 @@ class VectorStore:
             texts: List of text chunks
             metadatas: List of metadata dicts for each chunk
             ids: List of unique IDs for each chunk
+            embeddings: Optional precomputed embeddings; generated here when omitted
         """
         try:
-            # Generate embeddings manually (now parallelized via bedrock_client)
-            embeddings = self.embedding_function(texts)
+            if embeddings is None:
+                # Generate embeddings for the whole batch in one call
+                embeddings = self.embedding_function.embed_documents(texts)
+            
+            # One contiguous float32 buffer; each sub-batch below is a zero-copy view of it
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
             
-            # Add to collection in smaller sub-batches to be safe (e.g., 500 at a time)
-            batch_size = 500
+            # Add to collection in sub-batches under Chroma's limit (usually a single call)
             total_added = 0
             
-            for i in range(0, len(texts), batch_size):
-                end_idx = min(i + batch_size, len(texts))
+            for i in range(0, len(texts), _ADD_BATCH_SIZE):
+                end_idx = min(i + _ADD_BATCH_SIZE, len(texts))
                 
                 self.collection.add(
                     documents=texts[i:end_idx],
@@ -113,16 +135,27 @@ class VectorStore:
             if threshold is None:
                 threshold = settings.similarity_threshold
             
-            # Generate query embedding
+            # Generate query embedding (cached for repeated queries)
+            query_embedding = self._embed_query(query)
             
-            # Generate query embedding
-            query_embedding = self.embedding_function([query])[0]
+            # Only pass a where clause when there is one; Chroma runs its filter path for any where argument
+            if filter_dict is None:
+                results = self.collection.query(query_embeddings=[query_embedding], n_results=top_k)
+            else:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k,
+                    where=filter_dict
+                )
             
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=filter_dict
-            )
+            if threshold >= KEEP_ALL_THRESHOLD:
+                # Nothing can be filtered out, return the first query's results as they are
+                filtered_results = {
+                    key: (results[key][0] if results[key] else [])
+                    for key in ('documents', 'metadatas', 'distances', 'ids')
+                }
+                logger.info(f"Search found {len(filtered_results['documents'])} matches, kept all")
+                return filtered_results
             
             # Filter by similarity threshold (convert distance to similarity)
             # ChromaDB uses L2 distance, lower is better
@@ -134,14 +167,16 @@ class VectorStore:
             }
             
             if results['documents'] and results['documents'][0]:
-                for i, distance in enumerate(results['distances'][0]):
-                    logger.debug(f"Found match: {distance}")
-                    # Filter by threshold
-                    if distance < threshold:
-                        filtered_results['documents'].append(results['documents'][0][i])
-                        filtered_results['metadatas'].append(results['metadatas'][0][i])
-                        filtered_results['distances'].append(distance)
-                        filtered_results['ids'].append(results['ids'][0][i])
+                distances = np.asarray(results['distances'][0], dtype=np.float32)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Found matches with distances: %s", distances)
+                
+                # Filter by threshold with one vectorized comparison
+                keep = np.flatnonzero(distances < threshold).tolist()
+                filtered_results['documents'] = [results['documents'][0][i] for i in keep]
+                filtered_results['metadatas'] = [results['metadatas'][0][i] for i in keep]
+                filtered_results['distances'] = [results['distances'][0][i] for i in keep]
+                filtered_results['ids'] = [results['ids'][0][i] for i in keep]
             
             logger.info(f"Search found {len(results['documents'][0] if results['documents'] else [])} matches, kept {len(filtered_results['documents'])} after filtering")
             return filtered_results
@@ -150,6 +185,49 @@ class VectorStore:
             logger.error(f"Error searching vector store: {str(e)}")
             raise
     
+    def _embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a search query, reusing the vector of an earlier query that normalizes the same.
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            Query embedding
+        """
+        key = query.strip().lower()
+        with self._query_embedding_lock:
+            embedding = self._query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embedding_function([query])[0]
+            with self._query_embedding_lock:
+                self._query_embedding_cache[key] = embedding
+        return embedding
+    
+    def get_existing_ids(self, ids: List[str]) -> Set[str]:
+        """Return the subset of IDs already stored in the collection."""
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=ids, include=[])['ids'])
+    
+    def reset(self) -> int:
+        """
+        Remove every document by dropping and recreating the collection.
+        
+        Avoids fetching all IDs into Python just to send them back in a delete call.
+        
+        Returns:
+            Number of documents removed
+        """
+        count = self.collection.count()
+        self.client.delete_collection(name=settings.collection_name)
+        self.collection = self.client.create_collection(
+            name=settings.collection_name,
+            metadata={"description": "RAG document chunks"}
+        )
+        logger.info(f"Reset collection {settings.collection_name} ({count} documents removed)")
+        return count
+    
     def get_collection_count(self) -> int:
         """Get total number of documents in collection."""
         return self.collection.count()
@@ -0,0 +1,13 @@
+"""Pytest configuration: make the backend packages importable and keep test storage out of the repo."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Services create their stores on import; point them at a throwaway directory
+_storage = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ.setdefault("DATA_FOLDER", os.path.join(_storage, "data"))
+os.environ.setdefault("STORAGE_FOLDER", _storage)
+os.environ.setdefault("CHROMA_DB_PATH", os.path.join(_storage, "chroma_db"))
+os.environ.setdefault("SESSION_DB_PATH", os.path.join(_storage, "sessions.db"))
@@ -0,0 +1,59 @@
+"""Tests for the API request/response models."""
+import pytest
+from pydantic import ValidationError
+
+from app.models import ChatRequest, ChatResponse
+
+
+def _chat_response(**overrides):
+    """Build a minimal valid ChatResponse."""
+    fields = {
+        "session_id": "session-1",
+        "user_message": {"role": "user", "content": "How do I reset my password?"},
+        "assistant_message": {"role": "assistant", "content": "Use the self-service portal."},
+    }
+    fields.update(overrides)
+    return ChatResponse(**fields)
+
+
+def test_chat_response_declares_rerank_summary():
+    assert "rerank_summary" in ChatResponse.model_fields
+
+
+def test_chat_response_rerank_summary_defaults_to_none():
+    response = _chat_response()
+
+    assert response.rerank_summary is None
+    assert response.sources == []
+
+
+def test_chat_response_parses_rerank_summary():
+    response = _chat_response(rerank_summary=[
+        {"initial_rank": 3, "final_rank": 1, "score": 0.92, "filename": "vpn.pdf", "page": "2"}
+    ])
+
+    result = response.rerank_summary[0]
+    assert (result.initial_rank, result.final_rank, result.filename) == (3, 1, "vpn.pdf")
+    assert result.score == pytest.approx(0.92)
+
+
+def test_chat_response_rerank_summary_page_defaults():
+    response = _chat_response(rerank_summary=[
+        {"initial_rank": 1, "final_rank": 1, "score": 0.5, "filename": "faq.md"}
+    ])
+
+    assert response.rerank_summary[0].page == "N/A"
+
+
+@pytest.mark.parametrize("message", ["", "   ", "\n\t"])
+def test_chat_request_rejects_blank_message(message):
+    with pytest.raises(ValidationError):
+        ChatRequest(session_id="session-1", message=message)
+
+
+def test_chat_request_keeps_message_unchanged():
+    request = ChatRequest(session_id="session-1", message="  printer offline  ")
+
+    assert request.message == "  printer offline  "
+    assert request.use_knowledge_base is True
+    assert request.use_reranking is False
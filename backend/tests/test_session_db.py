@@ -0,0 +1,112 @@
+"""Tests for the session database read caches, message writes and ingestion jobs."""
+from datetime import datetime, timedelta
+
+import pytest
+
+session_db_module = pytest.importorskip("database.session_db")
+session_db = session_db_module.session_db
+
+
+@pytest.fixture
+def session_id():
+    session = session_db.create_session("Test session")
+    yield session.id
+    session_db.delete_session(session.id)
+
+
+def _invalidate_while_reading(monkeypatch, session_id):
+    """Make the next database read behave as if a write committed while it was in flight."""
+    open_session = session_db.get_session
+
+    def get_session():
+        db = open_session()
+        session_db._invalidate_session(session_id)
+        monkeypatch.setattr(session_db, "get_session", open_session)
+        return db
+
+    monkeypatch.setattr(session_db, "get_session", get_session)
+
+
+def test_messages_read_overlapping_a_write_is_not_cached(monkeypatch, session_id):
+    session_db.begin_turn(session_id, "first question")
+    _invalidate_while_reading(monkeypatch, session_id)
+
+    messages = session_db.get_session_messages(session_id)
+
+    assert [m.content for m in messages] == ["first question"]
+    assert (session_id, None, True) not in session_db._messages_cache
+
+    # A read with no concurrent write fills the cache as usual
+    session_db.get_session_messages(session_id)
+    assert (session_id, None, True) in session_db._messages_cache
+
+
+def test_session_read_overlapping_a_write_is_not_cached(monkeypatch, session_id):
+    session_db._invalidate_session(session_id)
+    _invalidate_while_reading(monkeypatch, session_id)
+
+    assert session_db.get_session_by_id(session_id).id == session_id
+    assert session_id not in session_db._session_cache
+
+    session_db.get_session_by_id(session_id)
+    assert session_id in session_db._session_cache
+
+
+def test_write_invalidates_cached_messages(session_id):
+    session_db.begin_turn(session_id, "first question")
+    assert len(session_db.get_session_messages(session_id)) == 1
+
+    session_db.begin_turn(session_id, "second question")
+
+    assert [m.content for m in session_db.get_session_messages(session_id)] == [
+        "first question", "second question"
+    ]
+
+
+def test_begin_turn_can_skip_storing(session_id):
+    session = session_db.begin_turn(session_id, "repeat", store_message=False)
+
+    assert session.id == session_id
+    assert session_db.get_session_messages(session_id) == []
+    assert session_db.begin_turn("missing-session", "hello") is None
+
+
+def test_bulk_insert_bumps_updated_at_to_latest_message(session_id):
+    started = datetime.utcnow()
+    session_db.add_messages_bulk([
+        {"session_id": session_id, "role": "user", "content": "q", "timestamp": started},
+        {"session_id": session_id, "role": "assistant", "content": "a",
+         "timestamp": started + timedelta(seconds=2), "rerank_summary": [{"score": 0.5}]},
+    ])
+
+    session, messages = session_db.get_session_with_messages(session_id)
+
+    assert session["updated_at"] == started + timedelta(seconds=2)
+    assert [m.role for m in messages] == ["user", "assistant"]
+    assert messages[1].rerank_summary == [{"score": 0.5}]
+
+
+@pytest.fixture
+def no_active_job():
+    session_db.fail_interrupted_ingestion_jobs()
+    yield
+    session_db.fail_interrupted_ingestion_jobs()
+
+
+def test_start_ingestion_job_reuses_the_active_job(no_active_job):
+    job, created = session_db.start_ingestion_job()
+    again, created_again = session_db.start_ingestion_job()
+
+    assert created and job.status == "queued"
+    assert not created_again and again.id == job.id
+
+
+def test_start_ingestion_job_loses_race_to_concurrent_job(monkeypatch, no_active_job):
+    job, _ = session_db.start_ingestion_job()
+    # The competing request's check ran before this job existed
+    monkeypatch.setattr(session_db, "_active_ingestion_job", lambda db: None)
+    monkeypatch.setattr(session_db, "get_active_ingestion_job", lambda: job)
+
+    other, created = session_db.start_ingestion_job()
+
+    assert not created and other.id == job.id
@@ -0,0 +1,69 @@
+"""Tests for VectorStore.search result filtering."""
+import pytest
+
+vector_store_module = pytest.importorskip("services.vector_store")
+VectorStore = vector_store_module.VectorStore
+KEEP_ALL_THRESHOLD = vector_store_module.KEEP_ALL_THRESHOLD
+
+
+class _RecordingCollection:
+    """Chroma collection double that returns canned query results and records the calls."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.results
+
+
+def _store(distances):
+    """Build a VectorStore around a recording collection, without a Chroma client or Bedrock."""
+    n = len(distances)
+    collection = _RecordingCollection({
+        "documents": [[f"doc {i}" for i in range(n)]],
+        "metadatas": [[{"filename": f"file{i}.md"} for i in range(n)]],
+        "distances": [list(distances)],
+        "ids": [[f"id{i}" for i in range(n)]],
+    })
+    store = object.__new__(VectorStore)
+    store.collection = collection
+    store._embed_query = lambda query: [0.0, 1.0]
+    return store, collection
+
+
+def test_keep_all_search_skips_distance_filtering():
+    # Distances beyond the sentinel itself would fail any comparison against it
+    store, _ = _store([0.2, 5e9, 1e12])
+
+    results = store.search("vpn setup", top_k=3, threshold=KEEP_ALL_THRESHOLD)
+
+    assert results["ids"] == ["id0", "id1", "id2"]
+    assert results["distances"] == [0.2, 5e9, 1e12]
+    assert results["documents"] == ["doc 0", "doc 1", "doc 2"]
+
+
+def test_threshold_search_drops_distant_matches():
+    store, _ = _store([0.2, 0.9, 0.4])
+
+    results = store.search("vpn setup", top_k=3, threshold=0.5)
+
+    assert results["ids"] == ["id0", "id2"]
+    assert results["metadatas"] == [{"filename": "file0.md"}, {"filename": "file2.md"}]
+
+
+def test_search_without_filter_omits_where():
+    store, collection = _store([0.1])
+
+    store.search("vpn setup", top_k=1, threshold=KEEP_ALL_THRESHOLD)
+
+    assert "where" not in collection.calls[0]
+
+
+def test_search_with_filter_passes_where():
+    store, collection = _store([0.1])
+
+    store.search("vpn setup", top_k=1, filter_dict={"filename": "file0.md"}, threshold=KEEP_ALL_THRESHOLD)
+
+    assert collection.calls[0]["where"] == {"filename": "file0.md"}
@@ -55,9 +55,28 @@ export const sendMessage = async (sessionId, message, useKnowledgeBase = true, u
 };
 
 // Ingestion endpoints
+const INGESTION_POLL_INTERVAL_MS = 2000;
+
+export const getIngestionJob = async (jobId) => {
+    const response = await api.get(`/ingest/status/${jobId}`);
+    return response.data;
+};
+
 export const ingestDocuments = async (settings = {}) => {
+    // Ingestion runs in the background; poll the job until it finishes
     const response = await api.post('/ingest', settings);
-    return response.data;
+    const { job_id: jobId } = response.data;
+
+    while (true) {
+        const job = await getIngestionJob(jobId);
+        if (job.status === 'completed') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Ingestion failed');
+        }
+        await new Promise((resolve) => setTimeout(resolve, INGESTION_POLL_INTERVAL_MS));
+    }
 };
 
 export const getIngestionStatus = async () => {
@@ -1,6 +1,7 @@
 
 import sys
 import os
+import asyncio
 sys.path.append(os.path.join(os.getcwd(), 'backend'))
 
 from app.config import settings
@@ -14,14 +15,15 @@ def test_retrieval():
         session_id = "test-session"
         
         print(f"Calling rag_engine.chat with query: {query}")
-        answer, sources = rag_engine.chat(
+        answer, sources, rerank_summary = asyncio.run(rag_engine.chat(
             query=query,
             session_id=session_id,
             use_knowledge_base=True,
             use_reranking=False
-        )
+        ))
         print(f"Answer: {answer}")
         print(f"Sources: {sources}")
+        print(f"Rerank summary: {rerank_summary}")
         
         print("Testing with reranking...")
         # This will trigger model load if enabled, but let's test the factory first